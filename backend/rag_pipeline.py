@@ -1,25 +1,65 @@
+import hashlib
+import json
 import os
+import sqlite3
+import sys
+import threading
+from contextlib import closing
 import pandas as pd
 from typing import List, Dict
-from sentence_transformers import SentenceTransformer
 import faiss
 import numpy as np
 
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+# The scraper's modules: its columnar reader and atomic file writes
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scraper.py'))
+
+from atomic_files import atomic_replace
+from columnar_output import load_long_table
+
 # Constants
 DIMENSIONS = 384  # based on 'all-MiniLM-L6-v2'
 EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+EMBEDDING_BATCH_SIZE = 256  # documents per encode() call when building the index
+STORE_FILENAME = "financials.db"  # consolidated store the scraper upserts every ticker into
+INDEX_DIR = os.path.join(".cache", "rag_index")  # saved index and the manifest of what it holds
+INDEX_FILENAME = "index.faiss"
+MANIFEST_FILENAME = "manifest.json"
+EMBEDDING_CACHE_PATH = os.path.join(".cache", "embeddings.db")  # text hash + model -> vector
+EMBEDDING_CACHE_CHUNK = 500  # hashes per SELECT, below SQLite's bound-parameter limit
 
-# Load model once globally
-embedder = SentenceTransformer(EMBEDDING_MODEL)
+# Loaded once, on first use (get_embedder), so importing this module stays cheap
+embedder = None
+_embedder_lock = threading.Lock()
 
-# Global variables for the index
+# Global variables for the index: doc texts are keyed by vector id, the manifest maps sources to ids
 global_index = None
 global_doc_texts = None
-global_doc_matrix = None
+global_manifest = None
+_update_lock = threading.Lock()
+_swap_lock = threading.Lock()
+_embedding_cache = None
+# Readiness: "idle" until initialization starts, then "loading", then "ready" or "failed"
+_status = {"state": "idle", "error": None}
+_status_lock = threading.Lock()
+_warmup_thread = None
+
+def get_embedder():
+    """The shared SentenceTransformer, loaded on the first call"""
+    global embedder
+    with _embedder_lock:
+        if embedder is None:
+            from sentence_transformers import SentenceTransformer
+            embedder = SentenceTransformer(EMBEDDING_MODEL)
+    return embedder
 
 def get_embedding(text: str) -> np.ndarray:
     """Get embedding for a single text"""
-    return embedder.encode(text.replace("\n", " "), convert_to_numpy=True)
+    return get_embedder().encode(text.replace("\n", " "), convert_to_numpy=True)
 
 def csv_to_documents(df: pd.DataFrame, company_name: str) -> List[str]:
     """Convert CSV to document chunks"""
@@ -37,77 +77,367 @@ def csv_to_documents(df: pd.DataFrame, company_name: str) -> List[str]:
                 continue
     return documents
 
-def build_faiss_index(docs: List[str]):
-    """Build FAISS index from documents"""
-    index = faiss.IndexFlatL2(DIMENSIONS)
-    doc_embeddings = [get_embedding(doc) for doc in docs]
-    doc_matrix = np.vstack(doc_embeddings).astype("float32")
-    index.add(doc_matrix)
-    return index, docs, doc_matrix
-
-def load_documents_from_csvs(folder_path: str) -> List[str]:
-    """Load all documents from CSVs in a folder"""
-    all_documents = []
+def long_table_to_documents(table: pd.DataFrame, company_name: str) -> List[str]:
+    """Convert a long table to document chunks; growth rows are labelled as growth"""
+    documents = []
+    for metric, year, value, kind in zip(table["metric"], table["year"], table["value"], table["kind"]):
+        label = f"{metric} growth (%)" if kind == "growth" else metric
+        documents.append(f"{company_name} | {label} in {year}: {value}")
+    return documents
+
+class EmbeddingCache:
+    """Persistent (model, sha256 of text) -> float32 vector table in SQLite"""
+
+    def __init__(self, path: str = EMBEDDING_CACHE_PATH, model_name: str = EMBEDDING_MODEL):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.model_name = model_name
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (model TEXT NOT NULL, text_hash BLOB NOT NULL, "
+            "vector BLOB NOT NULL, PRIMARY KEY (model, text_hash)) WITHOUT ROWID")
+
+    @staticmethod
+    def text_hash(text: str) -> bytes:
+        return hashlib.sha256(text.encode("utf-8")).digest()
+
+    def get_many(self, hashes: List[bytes]) -> Dict[bytes, np.ndarray]:
+        """The cached vectors for whichever of these hashes have one"""
+        found = {}
+        with self._lock:
+            for start in range(0, len(hashes), EMBEDDING_CACHE_CHUNK):
+                chunk = hashes[start:start + EMBEDDING_CACHE_CHUNK]
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN "
+                    f"({', '.join('?' * len(chunk))})", [self.model_name, *chunk])
+                found.update((text_hash, np.frombuffer(vector, dtype="float32")) for text_hash, vector in rows)
+        return found
+
+    def put_many(self, hashes: List[bytes], vectors: np.ndarray) -> None:
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, vector) VALUES (?, ?, ?)",
+                [(self.model_name, text_hash, vector.astype("float32").tobytes())
+                 for text_hash, vector in zip(hashes, vectors)])
+
+def get_embedding_cache():
+    """The shared embedding cache, opened on first use; None if it cannot be opened"""
+    global _embedding_cache
+    if _embedding_cache is None:
+        try:
+            _embedding_cache = EmbeddingCache()
+        except (OSError, sqlite3.Error) as e:
+            print(f"Warning: embedding cache unavailable, every document will be encoded: {e}")
+            return None
+    return _embedding_cache
+
+def embed_documents(docs: List[str], batch_size: int = EMBEDDING_BATCH_SIZE, cache=None) -> np.ndarray:
+    """Encode documents in batches into one float32 matrix, row i being docs[i]
+
+    With an EmbeddingCache, documents whose text was embedded before are
+    copied from it and only new texts are encoded (and then cached).
+    Documents are batched in length order so each batch pads to a similar
+    length, and every batch is written straight into the preallocated matrix.
+    """
+    texts = [doc.replace("\n", " ") for doc in docs]
+    doc_matrix = np.empty((len(texts), DIMENSIONS), dtype="float32")
+    missing = list(range(len(texts)))
+    if cache is not None:
+        hashes = [cache.text_hash(text) for text in texts]
+        cached = cache.get_many(list(set(hashes)))
+        missing = []
+        for i, text_hash in enumerate(hashes):
+            vector = cached.get(text_hash)
+            if vector is None:
+                missing.append(i)
+            else:
+                doc_matrix[i] = vector
+
+    order = sorted(missing, key=lambda i: len(texts[i]))
+    for start in range(0, len(order), batch_size):
+        batch = order[start:start + batch_size]
+        doc_matrix[batch] = get_embedder().encode([texts[i] for i in batch], batch_size=len(batch), convert_to_numpy=True)
+    if cache is not None and order:
+        cache.put_many([hashes[i] for i in order], doc_matrix[order])
+    return doc_matrix
+
+def document_fingerprint(docs: List[str], model_name: str = EMBEDDING_MODEL) -> str:
+    """sha256 of the embedding model name and every document, in order"""
+    digest = hashlib.sha256(model_name.encode("utf-8"))
+    for doc in docs:
+        digest.update(b"\0")
+        digest.update(doc.encode("utf-8"))
+    return digest.hexdigest()
+
+def document_company(filename: str) -> str:
+    """The company name documents carry: the stem of the ticker's CSV file, e.g. AAPL_financial_data"""
+    return os.path.splitext(filename)[0]
+
+def load_csv_sources(folder_path: str, skip=()) -> Dict[str, List[str]]:
+    """Documents from each CSV in a folder, keyed by file name; file names in skip (lower case) are left out"""
+    sources = {}
     
     if not os.path.exists(folder_path):
         print(f"Warning: Folder {folder_path} does not exist")
-        return all_documents
+        return sources
     
-    csv_files = [f for f in os.listdir(folder_path) if f.endswith(".csv")]
+    csv_files = sorted(f for f in os.listdir(folder_path) if f.endswith(".csv") and f.lower() not in skip)
     print(f"Found {len(csv_files)} CSV files")
     
     for file in csv_files:
         filepath = os.path.join(folder_path, file)
-        company_name = file.replace(".csv", "")
+        company_name = document_company(file)
+        table_path = os.path.join(folder_path, company_name + ".arrow")
         try:
-            df = pd.read_csv(filepath, header=None)
-            documents = csv_to_documents(df, company_name)
-            all_documents.extend(documents)
+            # Prefer the typed columnar file written alongside the CSV
+            if pa is not None and os.path.exists(table_path):
+                documents = long_table_to_documents(load_long_table(table_path), company_name)
+            else:
+                df = pd.read_csv(filepath, header=None)
+                documents = csv_to_documents(df, company_name)
+            sources[file] = documents
             print(f"Loaded {len(documents)} documents from {file}")
         except Exception as e:
             print(f"Error loading {file}: {e}")
     
-    return all_documents
+    return sources
 
-def initialize_rag_system(csv_folder: str = "data"):
-    """Initialize the RAG system with documents"""
-    global global_index, global_doc_texts, global_doc_matrix
-    
+def store_csv_names(conn) -> Dict[str, str]:
+    """Each stored ticker's CSV file name; tickers stored without one get <TICKER>_financial_data.csv"""
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(tickers)")]
+    query = "SELECT ticker, filename FROM tickers" if "filename" in columns else "SELECT ticker, NULL FROM tickers"
+    return {ticker: filename or f"{ticker}_financial_data.csv" for ticker, filename in conn.execute(query)}
+
+def load_store_sources(db_path: str):
+    """Documents for every ticker in the consolidated store (one query), keyed by <store>:<ticker>
+
+    Returns the sources and the lower-case names of the CSV files they
+    replace. Documents name the company after the ticker's CSV, as the CSV
+    documents do, so a ticker reads the same whichever source it came from.
+    """
+    with closing(sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)) as conn:
+        filenames = store_csv_names(conn)
+        table = pd.read_sql_query(
+            "SELECT ticker, metric, year, value, kind FROM financials ORDER BY ticker, kind, metric, year DESC",
+            conn)
+    sources = {}
+    for ticker, rows in table.groupby("ticker", sort=False):
+        filename = filenames.get(ticker, f"{ticker}_financial_data.csv")
+        sources[f"{STORE_FILENAME}:{ticker}"] = long_table_to_documents(rows, document_company(filename))
+    print(f"Loaded {len(table)} documents for {len(sources)} companies from {db_path}")
+    return sources, {filename.lower() for filename in filenames.values()}
+
+def load_document_sources(csv_folder: str = "data") -> Dict[str, List[str]]:
+    """Documents grouped by where they came from: the store's tickers, then the CSVs of every other ticker
+
+    The store only holds the tickers scraped since it was created, so CSV
+    files it does not cover are still read.
+    """
+    sources, skip = {}, set()
+    db_path = os.path.join(csv_folder, STORE_FILENAME)
+    if os.path.exists(db_path):
+        print("Loading the financial store...")
+        try:
+            sources, skip = load_store_sources(db_path)
+        except Exception as e:
+            print(f"Error loading {db_path}: {e}")
+            sources, skip = {}, set()
     print("Loading CSVs...")
-    docs = load_documents_from_csvs(csv_folder)
+    sources.update(load_csv_sources(csv_folder, skip))
+    return {source: docs for source, docs in sources.items() if docs}
+
+def new_index():
+    """An empty index whose vectors carry our own ids, so one source's vectors can be removed"""
+    return faiss.IndexIDMap(faiss.IndexFlatL2(DIMENSIONS))
+
+def empty_manifest() -> Dict:
+    # sources: source -> {"fingerprint", "first_id", "count"}; a source's vectors have ids first_id..first_id+count-1
+    return {"model": EMBEDDING_MODEL, "next_id": 0, "sources": {}}
+
+def save_index(index_dir: str, index, manifest: Dict) -> None:
+    """Write the index and then its manifest, each replaced atomically"""
+    with atomic_replace(os.path.join(index_dir, INDEX_FILENAME)) as tmp_path:
+        faiss.write_index(index, tmp_path)
+    with atomic_replace(os.path.join(index_dir, MANIFEST_FILENAME)) as tmp_path:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(dict(manifest, ntotal=index.ntotal), f)
+
+def load_index(index_dir: str):
+    """(index, manifest) saved in index_dir, or None if missing, inconsistent or built with another model"""
+    index_path = os.path.join(index_dir, INDEX_FILENAME)
+    try:
+        with open(os.path.join(index_dir, MANIFEST_FILENAME), encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("model") != EMBEDDING_MODEL or not os.path.exists(index_path):
+        return None
+    try:
+        index = faiss.read_index(index_path, faiss.IO_FLAG_MMAP)
+    except RuntimeError:
+        # Not every index type can be memory-mapped
+        index = faiss.read_index(index_path)
+    # A crash between the two writes leaves an index the manifest does not describe
+    if index.ntotal != manifest.pop("ntotal", None):
+        return None
+    return index, manifest
+
+def update_index(index, manifest: Dict, sources: Dict[str, List[str]], batch_size: int = EMBEDDING_BATCH_SIZE,
+                 cache=None):
+    """Bring an index up to date with sources, embedding only the documents of changed sources
+
+    Returns (index, manifest, changed sources). The update is applied to a
+    copy, so searches keep using the old index until the caller swaps it in.
+    """
+    previous = manifest["sources"]
+    fingerprints = {source: document_fingerprint(docs) for source, docs in sources.items()}
+    stale = [source for source, entry in previous.items() if fingerprints.get(source) != entry["fingerprint"]]
+    fresh = [source for source in sources if source not in previous or source in stale]
+    if not stale and not fresh:
+        return index, manifest, []
+
+    index = faiss.clone_index(index)
+    if stale:
+        old_ids = np.concatenate([np.arange(previous[source]["first_id"],
+                                            previous[source]["first_id"] + previous[source]["count"])
+                                  for source in stale]).astype("int64")
+        index.remove_ids(old_ids)
+
+    entries = {source: entry for source, entry in previous.items() if source not in stale}
+    next_id = manifest["next_id"]
+    new_docs = [doc for source in fresh for doc in sources[source]]
+    if new_docs:
+        doc_matrix = embed_documents(new_docs, batch_size, cache)
+        index.add_with_ids(doc_matrix, np.arange(next_id, next_id + len(new_docs), dtype="int64"))
+    for source in fresh:
+        entries[source] = {"fingerprint": fingerprints[source], "first_id": next_id, "count": len(sources[source])}
+        next_id += len(sources[source])
+
+    manifest = {"model": EMBEDDING_MODEL, "next_id": next_id, "sources": entries}
+    return index, manifest, sorted(set(stale) | set(fresh))
+
+def refresh_rag_index(csv_folder: str = "data", index_dir: str = INDEX_DIR,
+                      batch_size: int = EMBEDDING_BATCH_SIZE) -> bool:
+    """Update the live index from the documents on disk, re-embedding only sources that changed
+
+    A source is one CSV file, or one ticker of the consolidated store. Their
+    vectors are removed and re-added by id (texts seen before come from the
+    embedding cache instead of the model), the result is saved to index_dir
+    (unless it is None) and swapped in for searches in one step.
+    """
+    global global_index, global_doc_texts, global_manifest
     
-    if not docs:
+    sources = load_document_sources(csv_folder)
+    if not sources:
         print("No documents found!")
         return False
     
-    print(f"Building FAISS index with {len(docs)} documents...")
-    global_index, global_doc_texts, global_doc_matrix = build_faiss_index(docs)
+    with _update_lock:
+        if global_index is not None:
+            current = (global_index, global_manifest)
+        else:
+            current = load_index(index_dir) if index_dir else None
+            if current is not None:
+                print(f"Loaded the saved FAISS index ({current[0].ntotal} vectors)")
+        index, manifest = current or (new_index(), empty_manifest())
+
+        index, manifest, changed = update_index(index, manifest, sources, batch_size, get_embedding_cache())
+        if changed:
+            count = sum(len(sources.get(source, [])) for source in changed)
+            print(f"Indexed {count} documents from {len(changed)} changed sources")
+            if index_dir:
+                try:
+                    save_index(index_dir, index, manifest)
+                except Exception as e:
+                    print(f"Warning: could not save the FAISS index: {e}")
+        
+        doc_texts = {}
+        for source, entry in manifest["sources"].items():
+            doc_texts.update(zip(range(entry["first_id"], entry["first_id"] + entry["count"]), sources[source]))
+        with _swap_lock:
+            global_index, global_doc_texts, global_manifest = index, doc_texts, manifest
+    return True
+
+def initialize_rag_system(csv_folder: str = "data", index_dir: str = INDEX_DIR):
+    """Initialize the RAG system with documents
+
+    The index is saved under index_dir and on the next start only the
+    sources whose documents changed are re-embedded; pass index_dir=None to
+    build in memory only.
+    """
+    _set_status("loading")
+    try:
+        if not refresh_rag_index(csv_folder, index_dir):
+            _set_status("failed", "No documents found")
+            return False
+    except Exception as e:
+        _set_status("failed", str(e))
+        raise
+    _set_status("ready")
     print("RAG system initialized successfully!")
     return True
 
+def _set_status(state: str, error: str = None) -> None:
+    with _status_lock:
+        _status.update(state=state, error=error)
+
+def rag_status() -> Dict:
+    """Readiness of the RAG system: state, error (if it failed) and documents indexed"""
+    with _status_lock:
+        status = dict(_status)
+    with _swap_lock:
+        status["documents"] = len(global_doc_texts) if global_doc_texts is not None else 0
+    return status
+
+def _warm_up(csv_folder: str, index_dir: str) -> None:
+    try:
+        initialize_rag_system(csv_folder, index_dir)
+    except Exception as e:
+        print(f"Warning: RAG system initialization failed: {e}")
+
+def start_rag_warmup(csv_folder: str = "data", index_dir: str = INDEX_DIR) -> threading.Thread:
+    """Initialize the RAG system in a background thread and return at once
+
+    Only one warm-up runs at a time and a finished one is not repeated unless
+    it failed; rag_status() reports when the index is ready.
+    """
+    global _warmup_thread
+    with _status_lock:
+        running = _warmup_thread is not None and _warmup_thread.is_alive()
+        if running or _status["state"] == "ready":
+            return _warmup_thread
+        _status.update(state="loading", error=None)
+        _warmup_thread = threading.Thread(target=_warm_up, args=(csv_folder, index_dir),
+                                          name="rag-warmup", daemon=True)
+        _warmup_thread.start()
+    return _warmup_thread
+
 def search_docs_st(question: str, k: int = 50) -> Dict:
     """Search documents using the initialized RAG system"""
-    global global_index, global_doc_texts, global_doc_matrix
+    with _swap_lock:
+        index, doc_texts = global_index, global_doc_texts
     
-    if global_index is None:
-        raise ValueError("RAG system not initialized. Call initialize_rag_system() first.")
+    if index is None and rag_status()["state"] == "idle":
+        # Nobody started a warm-up: initialize on first use
+        initialize_rag_system()
+        with _swap_lock:
+            index, doc_texts = global_index, global_doc_texts
+    if index is None:
+        raise ValueError(f"RAG system not ready ({rag_status()['state']}). "
+                         "Call initialize_rag_system() or start_rag_warmup() first.")
     
     question_vec = get_embedding(question).reshape(1, -1).astype("float32")
-    distances, indices = global_index.search(question_vec, k)
+    distances, indices = index.search(question_vec, k)
     
-    retrieved_docs = [global_doc_texts[i] for i in indices[0]]
+    # FAISS pads with id -1 when the index holds fewer than k vectors
+    found = indices[0] != -1
+    distances, indices = distances[0][found], indices[0][found]
+    retrieved_docs = [doc_texts[i] for i in indices]
     
     return {
         "combined": pd.Series(retrieved_docs),
         "documents": retrieved_docs,
-        "distances": distances[0],
-        "indices": indices[0]
+        "distances": distances,
+        "indices": indices
     }
 
-# Initialize on import (you can also call this manually)
-if __name__ != "__main__":
-    # Try to initialize automatically when imported
-    try:
-        initialize_rag_system()
-    except Exception as e:
-        print(f"Warning: Could not auto-initialize RAG system: {e}")
\ No newline at end of file
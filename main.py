@@ -1,5 +1,6 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 import sys
 import os
@@ -8,7 +9,7 @@ import os
 sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
 
 from backend.claude_finance_tool import generate_response_with_rag_claude
-from backend.rag_pipeline import initialize_rag_system
+from backend.rag_pipeline import rag_status, start_rag_warmup
 
 app = FastAPI(title="FinTastic API", version="1.0.0")
 
@@ -24,13 +25,11 @@ app.add_middleware(
 class Query(BaseModel):
     question: str
 
-# Initialize RAG system on startup
+# Build the RAG index in the background on startup; /ready reports when it is done
 @app.on_event("startup")
 async def startup_event():
     print("Initializing FinTastic RAG system...")
-    success = initialize_rag_system("data")  # Adjust path as needed
-    if not success:
-        print("Warning: RAG system initialization failed")
+    start_rag_warmup("data")  # Adjust path as needed
 
 @app.get("/")
 async def root():
@@ -40,6 +39,13 @@ async def root():
 async def health_check():
     return {"status": "healthy", "service": "FinTastic"}
 
+@app.get("/ready")
+async def ready():
+    status = rag_status()
+    if status["state"] != "ready":
+        return JSONResponse(status_code=503, content=status)
+    return status
+
 @app.post("/api/ask")
 async def ask(query: Query):
     try:
@@ -0,0 +1,125 @@
+"""Concurrent asyncio fetch mode for the financial scraper.
+
+Tickers run concurrently while each ticker still walks its URL fallback chain
+in order. Requests per host are bounded by a semaphore and the per-domain rate
+limit is awaited, so waiting on one site never blocks work on another. Blocking
+requests/BeautifulSoup calls run in worker threads via asyncio.to_thread.
+"""
+import asyncio
+import random
+from urllib.parse import urlparse
+
+import pandas as pd
+
+from financial_scraper import (
+    DATA_DIR,
+    build_urls,
+    create_session_pool,
+    finish_ticker,
+    parse_page,
+    scrape_financial_data,
+)
+from scrape_metrics import METRICS
+
+class HostLimiter:
+    """Per-host concurrency limits for the async fetcher, backed by the shared session pool"""
+
+    def __init__(self, max_per_host=4, delay_range=(1.5, 3.0), pool=None, rate_limiter=None, cache=None):
+        self.max_per_host = max_per_host
+        self.delay_range = delay_range
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        self._semaphores = {}
+        self._own_pool = pool is None
+        self.pool = create_session_pool(pool_size=max_per_host) if pool is None else pool
+
+    def semaphore(self, host):
+        # Created lazily so the semaphores bind to the running event loop
+        if host not in self._semaphores:
+            self._semaphores[host] = asyncio.Semaphore(self.max_per_host)
+        return self._semaphores[host]
+
+    def close(self):
+        if self._own_pool:
+            self.pool.close()
+
+async def fetch_url(url, limiter, ticker=None, archive=None):
+    """Fetch one URL without blocking the event loop; downloaded pages are archived under ticker"""
+    host = urlparse(url).netloc
+
+    # Pages still within the cache TTL need neither a request slot nor a token. The same pool, rate
+    # limiter and archive are passed in case the cached body turns out to be unreadable and is fetched.
+    cache = limiter.cache
+    if cache is not None and cache.is_fresh(cache.lookup(url)):
+        return await asyncio.to_thread(scrape_financial_data, url, delay_range=None, pool=limiter.pool,
+                                       limiter=limiter.rate_limiter, cache=cache, archive=archive, ticker=ticker)
+
+    async with limiter.semaphore(host):
+        if limiter.rate_limiter is not None:
+            # Wait out the domain's budget here so the worker thread's token is ready immediately
+            with METRICS.timer("scraper_page_seconds", stage="rate_limit_wait", domain=host):
+                await asyncio.sleep(limiter.rate_limiter.ready_in(url))
+        elif limiter.delay_range:
+            # Jittered politeness delay, awaited instead of time.sleep
+            with METRICS.timer("scraper_page_seconds", stage="delay", domain=host):
+                await asyncio.sleep(random.uniform(*limiter.delay_range))
+        return await asyncio.to_thread(scrape_financial_data, url, delay_range=None, pool=limiter.pool,
+                                       limiter=limiter.rate_limiter, cache=cache, archive=archive, ticker=ticker)
+
+async def scrape_ticker_async(ticker, limiter, output_dir=DATA_DIR, api_fallback=False, archive=None,
+                              store=None, incremental=False):
+    """Walk one ticker's URL fallback chain until a page parses, then analyze and save it"""
+    raw_df = pd.DataFrame()
+
+    # The fallback chain stays sequential per ticker; other tickers run meanwhile. Timings recorded
+    # in this task, and in the threads it starts, are labelled with the ticker.
+    with METRICS.labels(ticker=ticker):
+        for url in build_urls(ticker):
+            print(f"\nTrying URL: {url}")
+            html_content = await fetch_url(url, limiter, ticker=ticker, archive=archive)
+
+            if not html_content:
+                print(f"Failed to retrieve data from {url}")
+                continue
+
+            print(f"Successfully retrieved HTML from {url}")
+
+            raw_df = await asyncio.to_thread(parse_page, url, html_content, limiter.cache)
+            if not raw_df.empty:
+                print(f"Successfully parsed financial data for {ticker}")
+                break
+            print("Retrieved HTML but could not parse financial data, trying next URL")
+
+    return await asyncio.to_thread(finish_ticker, ticker, raw_df, True, output_dir, api_fallback, store,
+                                   incremental)
+
+async def run_async(tickers, output_dir=DATA_DIR, api_fallback=False, archive=None, store=None, incremental=False,
+                    max_per_host=4, max_tickers=32, delay_range=(1.5, 3.0), pool=None, limiter=None, cache=None):
+    """Scrape many tickers concurrently with bounded per-host concurrency"""
+    limiter = HostLimiter(max_per_host=max_per_host, delay_range=delay_range, pool=pool,
+                          rate_limiter=limiter, cache=cache)
+    ticker_slots = asyncio.Semaphore(max_tickers)
+
+    async def worker(ticker):
+        async with ticker_slots:
+            try:
+                return await scrape_ticker_async(ticker, limiter, output_dir=output_dir,
+                                                 api_fallback=api_fallback, archive=archive, store=store,
+                                                 incremental=incremental)
+            except Exception as e:
+                print(f"Error analyzing {ticker} financials: {str(e)}")
+                return None
+
+    try:
+        outcomes = await asyncio.gather(*(worker(ticker) for ticker in tickers))
+    finally:
+        limiter.close()
+
+    results = dict(zip(tickers, outcomes))
+    succeeded = sum(1 for result in results.values() if result is not None)
+    print(f"\nScraped {succeeded}/{len(tickers)} tickers successfully")
+    return results
+
+def run_concurrent(tickers, **kwargs):
+    """Synchronous entry point for the async fetch mode"""
+    return asyncio.run(run_async(tickers, **kwargs))
@@ -0,0 +1,32 @@
+"""Atomic file replacement shared by the scraper's caches and outputs.
+
+A file is written to a temp file in the same directory and then renamed over
+the target, so a reader sees either the old file or the complete new one,
+never a partial write. When writing fails the temp file is removed.
+"""
+import os
+import tempfile
+from contextlib import contextmanager
+
+@contextmanager
+def atomic_replace(path):
+    """Yield a temp path next to path; it is renamed over path if the block succeeds and removed if it raises"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}-")
+    os.close(fd)
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def write_atomic(path, data):
+    """Replace path with data (bytes, or str written as UTF-8)"""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    with atomic_replace(path) as tmp_path:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
@@ -0,0 +1,404 @@
+"""Offline benchmarks for the scraper, run against the pages saved in debug/.
+
+    python benchmarks.py --repeat 3 parse
+    python benchmarks.py embedded
+    python benchmarks.py clean --tickers 10000
+    python benchmarks.py growth --tickers 1000
+    python benchmarks.py ratios --tickers 500
+    python benchmarks.py --repeat 5 pipeline
+"""
+import argparse
+import contextlib
+import glob
+import io
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from financial_scraper import (REPO_ROOT, calculate_financial_ratios, calculate_growth_rates,
+                               calculate_panel_ratios, clean_dataframe, clean_value, parse_financial_data, save_to_csv,
+                               stack_panel)
+from embedded_data import MARKETWATCH_TABLE_MARKER, YAHOO_TIMESERIES_MARKER, extract_embedded_data
+from lxml_parser import LXML_AVAILABLE
+
+DEBUG_DIR = os.path.join(REPO_ROOT, "debug")
+
+# Saved pages carry no URL; the layout marker tells which site plugin the scraper would pick
+PAGE_SITE_MARKERS = [
+    (MARKETWATCH_TABLE_MARKER, "https://www.marketwatch.com/"),
+    ("cr_dataTable", "https://www.wsj.com/"),
+    (YAHOO_TIMESERIES_MARKER, "https://finance.yahoo.com/"),
+]
+
+def load_pages(pages_dir=DEBUG_DIR):
+    """Return {file name: html} for every saved page"""
+    pages = {}
+    for path in sorted(glob.glob(os.path.join(pages_dir, "*.html"))):
+        with open(path, encoding="utf-8") as f:
+            pages[os.path.basename(path)] = f.read()
+    return pages
+
+def page_url(html):
+    """A URL on the site a saved page came from, or None for an unknown layout"""
+    for marker, url in PAGE_SITE_MARKERS:
+        if marker in html:
+            return url
+    return None
+
+def time_call(func, *args, repeat=1, **kwargs):
+    """Best-of-`repeat` wall time in seconds and the last result, with prints silenced
+
+    An exception is returned as the result so one bad page does not stop the run.
+    """
+    best = None
+    result = None
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                result = e
+            elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def peak_memory(func, *args, **kwargs):
+    """Peak bytes allocated by one call (tracemalloc) and its result, with prints silenced"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        tracemalloc.start()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            result = e
+        finally:
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+    return peak, result
+
+def same_result(results):
+    """True when every result is an equal DataFrame, or every result is the same kind of error"""
+    first = results[0]
+    if isinstance(first, Exception):
+        return all(type(result) is type(first) for result in results)
+    return all(not isinstance(result, Exception) and result.equals(first) for result in results)
+
+def benchmark_parse(pages, repeat=3):
+    """Per-page parse time for every available parser backend"""
+    backends = ["bs4", "lxml"] if LXML_AVAILABLE else ["bs4"]
+    totals = dict.fromkeys(backends, 0.0)
+
+    print(f"{'page':<36}{'KB':>6}" + "".join(f"{backend + ' ms':>12}" for backend in backends) + f"{'same':>6}")
+    for name, html in pages.items():
+        timings = {}
+        frames = {}
+        for backend in backends:
+            timings[backend], frames[backend] = time_call(parse_financial_data, html, backend=backend, embedded=False,
+                                                             repeat=repeat)
+            totals[backend] += timings[backend]
+        same = same_result(list(frames.values()))
+        print(f"{name:<36}{len(html) / 1024:>6.0f}" + "".join(f"{timings[b] * 1000:>12.1f}" for b in backends)
+              + f"{'yes' if same else 'NO':>6}")
+
+    print(f"{'total':<42}" + "".join(f"{totals[b] * 1000:>12.1f}" for b in backends))
+    for backend in backends[1:]:
+        print(f"{backend} speedup over bs4: {totals['bs4'] / totals[backend]:.1f}x")
+    return totals
+
+def benchmark_embedded(pages, repeat=3):
+    """Per-page time of the embedded-data extractors against a full DOM parse"""
+    backend = "lxml" if LXML_AVAILABLE else "bs4"
+    totals = {"embedded": 0.0, backend: 0.0}
+
+    print(f"{'page':<36}{'KB':>6}{'embedded ms':>14}{'rows':>6}{backend + ' ms':>12}")
+    for name, html in pages.items():
+        embedded_time, (rows, _) = time_call(extract_embedded_data, html, repeat=repeat)
+        dom_time, _ = time_call(parse_financial_data, html, backend=backend, embedded=False, repeat=repeat)
+        totals["embedded"] += embedded_time
+        totals[backend] += dom_time
+        print(f"{name:<36}{len(html) / 1024:>6.0f}{embedded_time * 1000:>14.1f}{len(rows):>6}{dom_time * 1000:>12.1f}")
+
+    print(f"{'total':<42}{totals['embedded'] * 1000:>14.1f}{'':>6}{totals[backend] * 1000:>12.1f}")
+    return totals
+
+def clean_cellwise(df):
+    """The original clean_dataframe: clean_value applied cell by cell"""
+    clean_df = pd.DataFrame(index=df.index)
+    for col in df.columns:
+        clean_df[col] = df[col].apply(clean_value)
+    return clean_df
+
+def same_values(left, right):
+    """True when two cleaned frames hold the same numbers (missing values compare equal)"""
+    return left.shape == right.shape and np.array_equal(left.to_numpy(dtype="float64"),
+                                                        right.to_numpy(dtype="float64"), equal_nan=True)
+
+def raw_page_frames(pages):
+    """The uncleaned metric x year frames the DOM parse produces for the saved pages"""
+    frames = []
+    for html in pages.values():
+        _, df = time_call(parse_financial_data, html, embedded=False)
+        if not isinstance(df, Exception) and not df.empty:
+            frames.append(df)
+    return frames
+
+def synthetic_raw_frame(frames, tickers, seed=0):
+    """A raw-cell (ticker, metric) x year panel shaped like `tickers` scraped statements
+
+    Cells are sampled from real scraped cells, so the mix of formats is
+    realistic, and their digits are scrambled so most values are distinct.
+    """
+    cells = [cell for frame in frames for cell in frame.to_numpy(dtype=object).ravel()]
+    rows_per_ticker = max(len(frame) for frame in frames)
+    columns = frames[0].columns
+    rng = random.Random(seed)
+    digits = "0123456789"
+    scrambles = [str.maketrans(digits, "".join(rng.sample(digits, len(digits)))) for _ in range(1000)]
+    sampled = [cell.translate(rng.choice(scrambles)) if isinstance(cell, str) else cell
+               for cell in rng.choices(cells, k=tickers * rows_per_ticker * len(columns))]
+    index = pd.MultiIndex.from_product([[f"T{ticker:05d}" for ticker in range(tickers)], range(rows_per_ticker)],
+                                       names=["ticker", "metric"])
+    return pd.DataFrame(np.array(sampled, dtype=object).reshape(len(index), len(columns)), index=index, columns=columns)
+
+def benchmark_clean(pages, repeat=3, tickers=10000):
+    """Cell-by-cell clean_value against the vectorized clean_dataframe
+
+    Uses the raw frames parsed from the saved pages (the size of one
+    data/*.csv statement each) and a synthetic frame of `tickers` statements.
+    """
+    frames = raw_page_frames(pages)
+    if not frames:
+        print("No page produced a raw frame")
+        return None
+
+    cellwise_total = vectorized_total = 0.0
+    same = True
+    for df in frames:
+        cellwise_time, expected = time_call(clean_cellwise, df, repeat=repeat)
+        vectorized_time, cleaned = time_call(clean_dataframe, df, repeat=repeat)
+        cellwise_total += cellwise_time
+        vectorized_total += vectorized_time
+        same = same and same_values(expected, cleaned)
+
+    synthetic = synthetic_raw_frame(frames, tickers)
+    synthetic_cellwise, expected = time_call(clean_cellwise, synthetic, repeat=1)
+    synthetic_vectorized, cleaned = time_call(clean_dataframe, synthetic, repeat=repeat)
+
+    print(f"{'frame':<40}{'cells':>10}{'cellwise ms':>14}{'vectorized ms':>16}{'same':>6}")
+    print(f"{f'{len(frames)} page frames':<40}{sum(df.size for df in frames):>10}"
+          f"{cellwise_total * 1000:>14.1f}{vectorized_total * 1000:>16.1f}{'yes' if same else 'NO':>6}")
+    print(f"{f'synthetic {tickers} tickers':<40}{synthetic.size:>10}{synthetic_cellwise * 1000:>14.1f}"
+          f"{synthetic_vectorized * 1000:>16.1f}{'yes' if same_values(expected, cleaned) else 'NO':>6}")
+    print(f"vectorized speedup on the synthetic frame: {synthetic_cellwise / synthetic_vectorized:.1f}x")
+    return {"pages": (cellwise_total, vectorized_total), "synthetic": (synthetic_cellwise, synthetic_vectorized)}
+
+def growth_rowwise(df):
+    """The original calculate_growth_rates: a row-wise apply per pair of years"""
+    if df.empty or len(df.columns) < 2:
+        return pd.DataFrame()
+    growth_df = pd.DataFrame(index=df.index)
+    for i in range(1, len(df.columns)):
+        curr_col = df.columns[i-1]
+        prev_col = df.columns[i]
+        growth_df[f"Growth {curr_col}"] = df.apply(
+            lambda row: ((row[curr_col] / row[prev_col]) - 1) * 100
+            if pd.notnull(row[curr_col]) and pd.notnull(row[prev_col]) and row[prev_col] != 0
+            else None,
+            axis=1
+        )
+    return growth_df
+
+def benchmark_growth(pages, repeat=3, tickers=1000):
+    """Row-wise apply against the vectorized calculate_growth_rates, per page and on a stacked panel"""
+    frames = [clean_dataframe(df) for df in raw_page_frames(pages)]
+    if not frames:
+        print("No page produced a raw frame")
+        return None
+
+    rowwise_total = vectorized_total = 0.0
+    same = True
+    for df in frames:
+        rowwise_time, expected = time_call(growth_rowwise, df, repeat=repeat)
+        vectorized_time, growth = time_call(calculate_growth_rates, df, repeat=repeat)
+        rowwise_total += rowwise_time
+        vectorized_total += vectorized_time
+        same = same and same_values(expected, growth)
+
+    panel = clean_dataframe(synthetic_raw_frame(frames, tickers))
+    panel_rowwise, expected = time_call(growth_rowwise, panel, repeat=1)
+    panel_vectorized, growth = time_call(calculate_growth_rates, panel, repeat=repeat)
+
+    print(f"{'frame':<40}{'rows':>10}{'row-wise ms':>14}{'vectorized ms':>16}{'same':>6}")
+    print(f"{f'{len(frames)} page frames':<40}{sum(len(df) for df in frames):>10}"
+          f"{rowwise_total * 1000:>14.1f}{vectorized_total * 1000:>16.1f}{'yes' if same else 'NO':>6}")
+    print(f"{f'panel of {tickers} tickers':<40}{len(panel):>10}{panel_rowwise * 1000:>14.1f}"
+          f"{panel_vectorized * 1000:>16.1f}{'yes' if same_values(expected, growth) else 'NO':>6}")
+    print(f"vectorized speedup on the panel: {panel_rowwise / panel_vectorized:.1f}x")
+    return {"pages": (rowwise_total, vectorized_total), "panel": (panel_rowwise, panel_vectorized)}
+
+# The alias lists the original calculate_financial_ratios scanned, most preferred first
+ORIGINAL_REVENUE_METRICS = ["Total Revenue", "Revenue", "Sales", "Net Sales", "Total Sales"]
+ORIGINAL_PROFIT_METRICS = {
+    "Gross Profit": ["Gross Profit", "Gross Income", "Gross Margin"],
+    "Operating Income": ["Operating Income", "Operating Profit", "Income from Operations", "Operating Earnings"],
+    "Net Income": ["Net Income", "Net Profit", "Net Earnings", "Net Income Common Stockholders",
+                   "Net Income to Common Shareholders", "Net Income Available to Common Shareholders"],
+    "EBITDA": ["EBITDA", "Earnings Before Interest, Taxes, Depreciation and Amortization"]
+}
+
+def ratios_looped(df):
+    """The original calculate_financial_ratios: alias lists scanned and years looped per ticker"""
+    ratios = pd.DataFrame(columns=df.columns)
+
+    def safe_ratio(numerator, denominator, multiplier=1):
+        result = []
+        for year in df.columns:
+            if (pd.notnull(numerator[year]) and pd.notnull(denominator[year]) and denominator[year] != 0):
+                result.append((numerator[year] / denominator[year]) * multiplier)
+            else:
+                result.append(None)
+        return pd.Series(result, index=df.columns)
+
+    revenue_row = None
+    for metric in ORIGINAL_REVENUE_METRICS:
+        if metric in df.index:
+            revenue_row = df.loc[metric]
+            break
+    metric_rows = {}
+    for key, possible_names in ORIGINAL_PROFIT_METRICS.items():
+        for name in possible_names:
+            if name in df.index:
+                metric_rows[key] = df.loc[name]
+                break
+    if revenue_row is not None:
+        for key, row in metric_rows.items():
+            ratios.loc[f"{key} Margin (%)"] = safe_ratio(row, revenue_row, 100)
+    return ratios
+
+def benchmark_ratios(pages, repeat=3, tickers=500):
+    """The original per-ticker loop and calculate_financial_ratios per ticker against one calculate_panel_ratios call"""
+    frames = []
+    for html in pages.values():
+        # The WSJ page only parses with its site parser
+        _, df = time_call(parse_financial_data, html, url=page_url(html))
+        if not isinstance(df, Exception) and not df.empty:
+            frames.append(clean_dataframe(df))
+    if not frames:
+        print("No page produced a frame")
+        return None
+    universe = {f"T{ticker:05d}": frames[ticker % len(frames)] for ticker in range(tickers)}
+    panel = stack_panel(universe)
+
+    def looped():
+        return {ticker: ratios_looped(df) for ticker, df in universe.items()}
+
+    def per_ticker():
+        return {ticker: calculate_financial_ratios(df) for ticker, df in universe.items()}
+
+    looped_time, _ = time_call(looped, repeat=1)
+    per_ticker_time, expected = time_call(per_ticker, repeat=repeat)
+    panel_time, ratios = time_call(calculate_panel_ratios, panel, repeat=repeat)
+    same = all(ratios.loc[ticker][df.columns].equals(df.astype("float64")) if not df.empty
+               else ticker not in ratios.index.get_level_values("ticker")
+               for ticker, df in expected.items())
+
+    print(f"{tickers} tickers, {len(panel)} panel rows, {len(ratios)} ratio rows")
+    print(f"original loop: {looped_time * 1000:.1f} ms, per ticker: {per_ticker_time * 1000:.1f} ms, "
+          f"panel: {panel_time * 1000:.1f} ms, panel same as per ticker: {'yes' if same else 'NO'}")
+    return looped_time, per_ticker_time, panel_time
+
+# The per-page stages of the scraper; each reads the page and earlier stages' results from `state`
+PIPELINE_STAGES = [
+    ("parse", lambda state: parse_financial_data(state["html"], url=state["url"])),
+    ("clean", lambda state: clean_dataframe(state["parse"])),
+    ("growth", lambda state: calculate_growth_rates(state["clean"])),
+    ("ratios", lambda state: calculate_financial_ratios(state["clean"])),
+    ("save", lambda state: save_to_csv(state["clean"], state["growth"], state["ratios"], filename=state["csv_path"])),
+]
+
+def benchmark_pipeline(pages, repeat=3):
+    """Per-stage latency and peak memory of the full per-page pipeline, and end-to-end pages/sec
+
+    Latency is the best of `repeat` runs per page; peak memory comes from a
+    separate tracemalloc run, so tracing does not skew the timings.
+    """
+    stages = [stage for stage, _ in PIPELINE_STAGES]
+    timings = {stage: [] for stage in stages}
+    peaks = dict.fromkeys(stages, 0)
+    failed = {}
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        for name, html in pages.items():
+            state = {"html": html, "url": page_url(html), "csv_path": os.path.join(output_dir, name + ".csv")}
+            page_timings = {}
+            for stage, func in PIPELINE_STAGES:
+                elapsed, result = time_call(func, state, repeat=repeat)
+                if isinstance(result, Exception):
+                    failed[name] = f"{stage}: {result}"
+                    break
+                peak, _ = peak_memory(func, state)
+                page_timings[stage] = elapsed
+                peaks[stage] = max(peaks[stage], peak)
+                state[stage] = result
+            else:
+                for stage, elapsed in page_timings.items():
+                    timings[stage].append(elapsed)
+
+    done = len(timings["parse"])
+    if not done:
+        print("No page made it through the pipeline")
+        return None
+    per_page = np.sum([timings[stage] for stage in stages], axis=0)
+
+    print(f"{'stage':<12}{'pages':>7}{'total ms':>11}{'mean ms':>10}{'p50 ms':>9}{'p95 ms':>9}{'peak KB':>10}")
+    rows = [(stage, np.array(timings[stage]), peaks[stage]) for stage in stages]
+    rows.append(("end-to-end", per_page, max(peaks.values())))
+    for stage, seconds, peak in rows:
+        ms = seconds * 1000
+        print(f"{stage:<12}{len(ms):>7}{ms.sum():>11.1f}{ms.mean():>10.2f}{np.percentile(ms, 50):>9.2f}"
+              f"{np.percentile(ms, 95):>9.2f}{peak / 1024:>10.0f}")
+    print(f"{done} pages, {done / per_page.sum():.1f} pages/sec end-to-end")
+    for name, reason in failed.items():
+        print(f"failed {name}: {reason}")
+    return {"timings": timings, "peaks": peaks, "failed": failed}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline scraper benchmarks over saved pages")
+    parser.add_argument("--pages", default=DEBUG_DIR, help="Directory of saved *.html pages")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement; the best is reported")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("parse", help="Compare parse_financial_data backends")
+    subparsers.add_parser("embedded", help="Compare embedded-data extraction with a DOM parse")
+    clean_parser = subparsers.add_parser("clean", help="Compare cell-by-cell and vectorized value cleaning")
+    clean_parser.add_argument("--tickers", type=int, default=10000, help="Statements in the synthetic frame")
+    growth_parser = subparsers.add_parser("growth", help="Compare row-wise and vectorized growth rates")
+    growth_parser.add_argument("--tickers", type=int, default=1000, help="Statements in the synthetic panel")
+    ratios_parser = subparsers.add_parser("ratios", help="Compare per-ticker and panel margin ratios")
+    ratios_parser.add_argument("--tickers", type=int, default=500, help="Tickers in the stacked universe")
+    subparsers.add_parser("pipeline", help="Per-stage latency, peak memory and pages/sec of the full pipeline")
+    args = parser.parse_args(argv)
+
+    pages = load_pages(args.pages)
+    if not pages:
+        print(f"No pages found in {args.pages}")
+        return
+    if args.command == "parse":
+        benchmark_parse(pages, repeat=args.repeat)
+    elif args.command == "embedded":
+        benchmark_embedded(pages, repeat=args.repeat)
+    elif args.command == "clean":
+        benchmark_clean(pages, repeat=args.repeat, tickers=args.tickers)
+    elif args.command == "growth":
+        benchmark_growth(pages, repeat=args.repeat, tickers=args.tickers)
+    elif args.command == "ratios":
+        benchmark_ratios(pages, repeat=args.repeat, tickers=args.tickers)
+    elif args.command == "pipeline":
+        benchmark_pipeline(pages, repeat=args.repeat)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Typed long-table output written next to each ticker's CSV.
+
+The CSV mixes the raw metrics, a "----------" separator, growth rows and
+ratio rows in one positional grid. The same numbers are also written as one
+long table, one row per (ticker, metric, year, kind), to an Arrow IPC file:
+uncompressed, so a reader can memory-map it and use the columns without
+parsing anything. kind is "value", "growth" or "ratio".
+
+pyarrow is optional: without it the CSV is still written and this step is
+skipped.
+"""
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+from atomic_files import atomic_replace
+
+LONG_TABLE_SUFFIX = ".arrow"
+LONG_TABLE_COLUMNS = ["ticker", "metric", "year", "value", "kind"]
+YEAR_IN_LABEL_PATTERN = re.compile(r'(\d{4})')
+
+if pa is not None:
+    LONG_TABLE_SCHEMA = pa.schema([
+        ("ticker", pa.string()),
+        ("metric", pa.string()),
+        ("year", pa.int16()),
+        ("value", pa.float64()),
+        ("kind", pa.dictionary(pa.int8(), pa.string())),
+    ])
+
+def _melt(frame, ticker, kind):
+    """Long rows for a metric x year frame whose column labels contain the year"""
+    if frame is None or frame.empty:
+        return None
+    years = [YEAR_IN_LABEL_PATTERN.search(str(col)) for col in frame.columns]
+    keep = [i for i, match in enumerate(years) if match]
+    values = frame.iloc[:, keep].to_numpy(dtype='float64')
+    return pd.DataFrame({
+        "ticker": ticker,
+        "metric": np.repeat(np.asarray(frame.index, dtype=object).astype(str), len(keep)),
+        "year": np.tile([int(years[i].group(1)) for i in keep], len(frame)).astype('int16'),
+        "value": values.ravel(),
+        "kind": kind,
+    })
+
+def to_long_table(ticker, df, growth_df, ratios_df):
+    """One row per (metric, year, kind) with its value; missing values are dropped"""
+    parts = [_melt(df, ticker, "value"), _melt(growth_df, ticker, "growth"), _melt(ratios_df, ticker, "ratio")]
+    parts = [part for part in parts if part is not None]
+    if not parts:
+        return pd.DataFrame(columns=LONG_TABLE_COLUMNS)
+    table = pd.concat(parts, ignore_index=True)
+    return table[table["value"].notna()].reset_index(drop=True)
+
+def long_table_path(csv_filename):
+    return os.path.splitext(csv_filename)[0] + LONG_TABLE_SUFFIX
+
+def save_long_table(table, filename):
+    """Write the long table as an Arrow IPC file; returns the path, or None without pyarrow"""
+    if pa is None:
+        print("pyarrow is not installed; skipping the columnar output")
+        return None
+
+    arrow_table = pa.Table.from_pandas(table[LONG_TABLE_COLUMNS], schema=LONG_TABLE_SCHEMA, preserve_index=False)
+    with atomic_replace(filename) as tmp_path:
+        with pa.OSFile(tmp_path, "wb") as sink:
+            with pa.ipc.new_file(sink, LONG_TABLE_SCHEMA) as writer:
+                writer.write_table(arrow_table)
+    print(f"Columnar data saved to {filename}")
+    return filename
+
+def load_long_table(filename):
+    """Memory-map a long table written by save_long_table and return it as a DataFrame"""
+    if pa is None:
+        raise ImportError("Reading the columnar output needs the pyarrow package")
+    with pa.memory_map(filename, "r") as source:
+        return pa.ipc.open_file(source).read_all().to_pandas()
@@ -0,0 +1,137 @@
+"""Statement data read straight from the data a page embeds for its own scripts.
+
+Most finance pages render their statement grid from data shipped in the HTML:
+Yahoo Finance inlines its fundamentals-timeseries API response in a
+<script type="application/json"> tag, Macrotrends assigns `var originalData`
+in a script, and MarketWatch puts each row's full-precision values in a
+data-chart-data attribute. These extractors find that payload with plain
+string search and decode only it (json.JSONDecoder.raw_decode from the
+payload's first character), so the page is never built into a DOM.
+
+Extractors return (rows, years) like the plugins in site_parsers: rows maps a
+metric label to its values (as strings, cleaned later like scraped cells),
+aligned with years. A page none of them recognises returns ({}, []).
+"""
+import html
+import json
+import re
+
+YAHOO_TIMESERIES_MARKER = 'data-url="https://query1.finance.yahoo.com/ws/fundamentals-timeseries/'
+YAHOO_PERIOD_PREFIX = 'annual'
+MACROTRENDS_DATA_PATTERN = re.compile(r'var\s+originalData\s*=\s*\[')
+MACROTRENDS_DATE_PATTERN = re.compile(r'^(\d{4})-\d{2}-\d{2}$')
+MARKETWATCH_TABLE_MARKER = 'aria-label="Financials - data table"'
+MARKETWATCH_YEAR_PATTERN = re.compile(r'<th class="overflow__heading"><div class="cell__content">\s*(20\d{2})\s*</div></th>')
+MARKETWATCH_LABEL_PATTERN = re.compile(r'fixed--cell[^"]*">([^<]*)<')
+MARKETWATCH_CHART_PATTERN = re.compile(r'data-chart-data="([^"]*)"')
+CAMEL_CASE_PATTERN = re.compile(r'(?<=[a-z0-9])(?=[A-Z])|(?<=[A-Z])(?=[A-Z][a-z])')
+TAG_PATTERN = re.compile(r'<[^>]+>')
+LOWERCASE_WORDS = {'And', 'Of', 'To', 'From', 'For', 'In', 'On', 'As'}
+
+_decoder = json.JSONDecoder()
+
+def _script_payloads(html_content, marker):
+    """Yield the text of every <script> element whose opening tag contains marker"""
+    position = html_content.find(marker)
+    while position != -1:
+        tag_start = html_content.rfind('<script', 0, position)
+        tag_end = html_content.find('>', position)
+        if tag_start != -1 and tag_end != -1 and '>' not in html_content[tag_start:position]:
+            body_end = html_content.find('</script>', tag_end)
+            if body_end == -1:
+                return
+            yield html_content[tag_end + 1:body_end]
+            position = body_end
+        position = html_content.find(marker, position + 1)
+
+def _label_from_type(type_name):
+    """'annualCostOfRevenue' -> 'Cost of Revenue'"""
+    words = CAMEL_CASE_PATTERN.sub(' ', type_name[len(YAHOO_PERIOD_PREFIX):]).split()
+    return ' '.join([words[0]] + [word.lower() if word in LOWERCASE_WORDS else word for word in words[1:]])
+
+def _format_value(value):
+    return '' if value is None else repr(float(value))
+
+def extract_yahoo_timeseries(html_content):
+    """Annual statement lines from Yahoo's inlined fundamentals-timeseries response"""
+    series = {}
+    for payload in _script_payloads(html_content, YAHOO_TIMESERIES_MARKER):
+        try:
+            # The fetched response is stored with its body as a JSON string
+            body = json.loads(json.loads(payload)['body'])
+            results = body['timeseries']['result']
+        except (ValueError, KeyError, TypeError):
+            continue
+        for result in results:
+            type_name = (result.get('meta', {}).get('type') or [''])[0]
+            if not type_name.startswith(YAHOO_PERIOD_PREFIX):
+                continue
+            values = {}
+            for point in result.get(type_name) or []:
+                if point and point.get('reportedValue'):
+                    values[point['asOfDate'][:4]] = point['reportedValue'].get('raw')
+            if values:
+                series[_label_from_type(type_name)] = values
+
+    years = sorted({year for values in series.values() for year in values}, reverse=True)
+    rows = {label: [_format_value(values.get(year)) for year in years] for label, values in series.items()}
+    return rows, years
+
+def extract_macrotrends_data(html_content):
+    """Statement lines from the `var originalData = [...]` array behind Macrotrends' grid"""
+    match = MACROTRENDS_DATA_PATTERN.search(html_content)
+    if not match:
+        return {}, []
+    try:
+        records, _ = _decoder.raw_decode(html_content, match.end() - 1)
+    except ValueError:
+        return {}, []
+
+    year_keys = {}
+    for record in records:
+        for key in record:
+            date_match = MACROTRENDS_DATE_PATTERN.match(key)
+            if date_match:
+                year_keys.setdefault(key, date_match.group(1))
+    keys = sorted(year_keys, reverse=True)
+
+    rows = {}
+    for record in records:
+        label = TAG_PATTERN.sub('', str(record.get('field_name', ''))).strip()
+        if label:
+            # A reported 0 is a value; only a missing key or null is an empty cell
+            rows[label] = ['' if record.get(key) is None else str(record.get(key)) for key in keys]
+    return rows, [year_keys[key] for key in keys]
+
+def extract_marketwatch_chart_data(html_content):
+    """Full-precision values from the trend chart attribute on each MarketWatch financials row"""
+    table_start = html_content.find(MARKETWATCH_TABLE_MARKER)
+    if table_start == -1:
+        return {}, []
+    table_end = html_content.find('</table>', table_start)
+    table = html_content[table_start:table_end]
+    header_end = table.find('</thead>')
+    years = MARKETWATCH_YEAR_PATTERN.findall(table, 0, header_end)
+    if not years:
+        return {}, []
+
+    rows = {}
+    for row in table[header_end:].split('<tr')[1:]:
+        label = MARKETWATCH_LABEL_PATTERN.search(row)
+        chart = MARKETWATCH_CHART_PATTERN.search(row)
+        if not label or not chart:
+            continue
+        values = chart.group(1).split(',')
+        if len(values) == len(years):
+            rows[html.unescape(label.group(1)).strip()] = values
+    return rows, years
+
+EMBEDDED_EXTRACTORS = [extract_yahoo_timeseries, extract_macrotrends_data, extract_marketwatch_chart_data]
+
+def extract_embedded_data(html_content):
+    """(rows, years) from the first extractor that recognises the page, else ({}, [])"""
+    for extract in EMBEDDED_EXTRACTORS:
+        rows, years = extract(html_content)
+        if rows:
+            return rows, years
+    return {}, []
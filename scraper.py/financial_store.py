@@ -0,0 +1,261 @@
+"""Consolidated SQLite store of every ticker's statements.
+
+One file holds the whole universe as a long table keyed by ticker, kind
+("value", "growth" or "ratio"), metric and fiscal year. The scraper upserts
+each ticker after analysis: refreshing a ticker replaces its rows for the
+years the new statements cover, so a renamed metric or a switch to another
+source leaves no stale rows behind, and keeps older years the page no longer
+shows. Readers (the RAG pipeline)
+load everything with one open and one query instead of parsing a CSV per
+ticker.
+
+The store also keeps each ticker's scrape state (last fetch time, a hash of
+the parsed statements and the latest fiscal year seen). In incremental mode
+the scraper skips tickers that are not due (refresh_due) and, when a fetched
+ticker's statements hash the same as last time, leaves its files alone; an
+upsert only rewrites rows whose value changed.
+
+Each ticker also records the name of its CSV, so readers that combine the
+store with the data folder know which files the store already covers.
+
+    python financial_store.py stats
+    python financial_store.py import ../data
+"""
+import argparse
+import os
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+
+from metric_names import metric_id
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STORE_PATH = os.path.join(REPO_ROOT, "data", "financials.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tickers (
+    ticker TEXT PRIMARY KEY,
+    company TEXT,
+    filename TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS financials (
+    ticker TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    value REAL NOT NULL,
+    metric_id TEXT,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (ticker, kind, metric, year)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS scrape_state (
+    ticker TEXT PRIMARY KEY,
+    data_hash TEXT,
+    latest_year INTEGER,
+    fetched_at REAL NOT NULL,
+    changed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS financials_by_year ON financials (year, ticker);
+CREATE INDEX IF NOT EXISTS financials_by_metric_id ON financials (metric_id, year);
+"""
+
+UPSERT_SQL = """
+INSERT INTO financials (ticker, kind, metric, year, value, metric_id, updated_at)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (ticker, kind, metric, year) DO UPDATE SET
+    value = excluded.value, metric_id = excluded.metric_id, updated_at = excluded.updated_at
+WHERE financials.value IS NOT excluded.value OR financials.metric_id IS NOT excluded.metric_id
+"""
+
+# Incremental mode: never refetch within MIN_REFETCH_AGE, always refetch after the recheck age
+MIN_REFETCH_AGE = 12 * 3600
+RECHECK_AGE = 30 * 24 * 3600
+
+def refresh_due(state, now=None, recheck_age=RECHECK_AGE):
+    """Whether a ticker with this scrape_state() record should be fetched again
+
+    Annual statements only change when a new fiscal year is reported (or a
+    filing is restated), so a ticker is due when it was never scraped, when
+    its latest year is older than last year, or when its last fetch is older
+    than recheck_age.
+    """
+    if state is None:
+        return True
+    now = time.time() if now is None else now
+    age = now - state["fetched_at"]
+    if age < MIN_REFETCH_AGE:
+        return False
+    if state["latest_year"] is None or state["latest_year"] < time.gmtime(now).tm_year - 1:
+        return True
+    return age >= recheck_age
+
+class FinancialStore:
+    """SQLite-backed (ticker, kind, metric, year) -> value store"""
+
+    def __init__(self, path=STORE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        # Analysis runs in worker threads in --async mode; the lock serialises access
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(tickers)")]
+        if "filename" not in columns:
+            # Stores created before tickers recorded their CSV
+            self._conn.execute("ALTER TABLE tickers ADD COLUMN filename TEXT")
+
+    def upsert(self, ticker, long_table, company=None, filename=None):
+        """Insert or update a ticker's rows from a to_long_table() frame; returns the rows changed
+
+        Stored rows for a year the frame covers that the frame no longer has
+        (a renamed metric, or a growth or ratio row that is no longer derived)
+        are deleted. filename is the name of the ticker's CSV in
+        the data folder, if it has one.
+        """
+        ticker = ticker.upper()
+        now = time.time()
+        rows = [(ticker, kind, metric, int(year), float(value), metric_id(metric), now)
+                for metric, year, value, kind in zip(long_table["metric"], long_table["year"],
+                                                     long_table["value"], long_table["kind"])]
+        keys = {(kind, metric, year) for _, kind, metric, year, *_ in rows}
+        years = {year for _, _, year in keys}
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            stored = self._conn.execute("SELECT kind, metric, year FROM financials WHERE ticker = ?",
+                                        (ticker,)).fetchall()
+            stale = [(ticker, kind, metric, year) for kind, metric, year in stored
+                     if year in years and (kind, metric, year) not in keys]
+            self._conn.executemany(
+                "DELETE FROM financials WHERE ticker = ? AND kind = ? AND metric = ? AND year = ?", stale)
+            self._conn.executemany(UPSERT_SQL, rows)
+            changed = self._conn.total_changes - before
+            self._conn.execute(
+                "INSERT INTO tickers (ticker, company, filename, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (ticker) DO UPDATE SET company = COALESCE(excluded.company, company), "
+                "filename = COALESCE(excluded.filename, filename), updated_at = excluded.updated_at",
+                (ticker, company, filename, now))
+        return changed
+
+    def scrape_state(self, ticker):
+        """The ticker's last scrape (data_hash, latest_year, fetched_at, changed_at), or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data_hash, latest_year, fetched_at, changed_at FROM scrape_state WHERE ticker = ?",
+                (ticker.upper(),)).fetchone()
+        if row is None:
+            return None
+        return dict(zip(["data_hash", "latest_year", "fetched_at", "changed_at"], row))
+
+    def record_scrape(self, ticker, data_hash, latest_year):
+        """Record a fetch of the ticker; returns True if its statements changed since the last one"""
+        ticker = ticker.upper()
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT data_hash FROM scrape_state WHERE ticker = ?", (ticker,)).fetchone()
+            changed = row is None or row[0] != data_hash
+            self._conn.execute(
+                "INSERT INTO scrape_state (ticker, data_hash, latest_year, fetched_at, changed_at) "
+                "VALUES (?, ?, ?, ?, ?) ON CONFLICT (ticker) DO UPDATE SET "
+                "data_hash = excluded.data_hash, latest_year = excluded.latest_year, "
+                "fetched_at = excluded.fetched_at, changed_at = CASE WHEN ? THEN excluded.changed_at ELSE changed_at END",
+                (ticker, data_hash, latest_year, now, now, changed))
+        return changed
+
+    def long_table(self, tickers=None, kind=None):
+        """The stored rows (ticker, company, metric, year, value, kind) as one DataFrame"""
+        query = ("SELECT f.ticker, t.company, f.metric, f.year, f.value, f.kind "
+                 "FROM financials f JOIN tickers t USING (ticker)")
+        clauses, params = [], []
+        if tickers:
+            clauses.append(f"f.ticker IN ({', '.join('?' * len(tickers))})")
+            params.extend(ticker.upper() for ticker in tickers)
+        if kind:
+            clauses.append("f.kind = ?")
+            params.append(kind)
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY f.ticker, f.kind, f.metric, f.year DESC"
+        with self._lock:
+            return pd.read_sql_query(query, self._conn, params=params)
+
+    def frame(self, ticker, kind="value"):
+        """One ticker's metric x year frame, most recent year first"""
+        table = self.long_table([ticker], kind=kind)
+        if table.empty:
+            return pd.DataFrame()
+        frame = table.pivot(index="metric", columns="year", values="value")
+        frame = frame[sorted(frame.columns, reverse=True)]
+        frame.columns = [str(year) for year in frame.columns]
+        return frame
+
+    def tickers(self):
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT ticker FROM tickers ORDER BY ticker")]
+
+    def stats(self):
+        with self._lock:
+            tickers, rows, first, last = self._conn.execute(
+                "SELECT COUNT(DISTINCT ticker), COUNT(*), MIN(year), MAX(year) FROM financials").fetchone()
+        return {"tickers": tickers, "rows": rows, "first_year": first, "last_year": last}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def read_saved_csv(path):
+    """Split a save_to_csv file back into its (values, growth, ratios) frames"""
+    data = pd.read_csv(path, index_col=0)
+    # Split by position: the same metric label appears in the value and growth sections
+    breaks = [i for i, label in enumerate(data.index) if str(label).startswith("----------")]
+    bounds = zip([0] + [i + 1 for i in breaks], breaks + [len(data)])
+    frames = [data.iloc[start:stop] for start, stop in bounds]
+    frames = [frame.dropna(axis=1, how="all") for frame in frames]
+    frames += [pd.DataFrame()] * (3 - len(frames))
+    return frames[:3]
+
+def import_csvs(store, data_dir):
+    """Load existing *_financial_data.csv files into the store; returns the tickers imported"""
+    from columnar_output import to_long_table
+    from financial_scraper import TICKERS
+    from metric_names import normalize_metric_labels
+
+    by_filename = {info["filename"]: (ticker, info["company"]) for ticker, info in TICKERS.items()}
+    imported = []
+    for name in sorted(os.listdir(data_dir)):
+        if not name.endswith("_financial_data.csv"):
+            continue
+        ticker, company = by_filename.get(name, (name[:-len("_financial_data.csv")].upper(), None))
+        frames = [normalize_metric_labels(frame.copy()) if not frame.empty else frame
+                  for frame in read_saved_csv(os.path.join(data_dir, name))]
+        store.upsert(ticker, to_long_table(ticker, *frames), company=company, filename=name)
+        imported.append(ticker)
+    return imported
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect or fill the consolidated financial store")
+    parser.add_argument("--store", default=STORE_PATH)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("stats", help="Show tickers, rows and year range")
+    import_parser = subparsers.add_parser("import", help="Load existing *_financial_data.csv files")
+    import_parser.add_argument("data_dir")
+    args = parser.parse_args(argv)
+
+    with FinancialStore(args.store) as store:
+        if args.command == "stats":
+            stats = store.stats()
+            print(f"{stats['tickers']} tickers, {stats['rows']} rows, years {stats['first_year']}-{stats['last_year']}")
+        elif args.command == "import":
+            print(f"Imported {len(import_csvs(store, args.data_dir))} tickers")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""On-disk HTTP cache for scraped financial pages.
+
+Bodies are stored gzip-compressed next to a small JSON record holding the
+ETag, Last-Modified, fetch time and content hash. Within the TTL a page is
+served without touching the network; after it, the cache supplies the
+validators for a conditional GET so an unchanged page costs a 304. The frame
+parsed from a page is cached under its content hash and the version of the
+parser that produced it, so an unchanged page is not parsed again either
+until the parser changes. A page that parses to nothing (a consent, captcha
+or "unusual traffic" page served with HTTP 200) is evicted, so the next run
+fetches it again instead of serving it for the rest of the TTL.
+"""
+import gzip
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+
+from atomic_files import write_atomic
+
+def content_hash(text):
+    """sha256 of a page body, used to detect unchanged content"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+class HttpCache:
+    """URL-keyed page cache with TTL and ETag/Last-Modified revalidation"""
+
+    def __init__(self, cache_dir, ttl=24 * 3600):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, url, suffix):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, key[:2], key + suffix)
+
+    def lookup(self, url):
+        """Return the metadata record for a URL, or None if it is not cached"""
+        try:
+            with open(self._path(url, ".json"), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def is_fresh(self, entry):
+        return entry is not None and time.time() - entry.get("fetched_at", 0) < self.ttl
+
+    def read_body(self, url):
+        try:
+            with gzip.open(self._path(url, ".html.gz"), "rt", encoding="utf-8") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def conditional_headers(self, entry):
+        """If-None-Match / If-Modified-Since headers for revalidating an entry"""
+        headers = {}
+        if entry and entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def store(self, url, text, response_headers=None):
+        """Save a freshly downloaded body and its validators"""
+        response_headers = response_headers or {}
+        entry = {
+            "url": url,
+            "etag": response_headers.get("ETag"),
+            "last_modified": response_headers.get("Last-Modified"),
+            "fetched_at": time.time(),
+            "content_hash": content_hash(text),
+            "size": len(text),
+        }
+        with self._lock:
+            write_atomic(self._path(url, ".html.gz"), gzip.compress(text.encode("utf-8")))
+            write_atomic(self._path(url, ".json"), json.dumps(entry).encode("utf-8"))
+        return entry
+
+    def refresh(self, url, entry):
+        """Mark an entry as revalidated (HTTP 304) so its TTL starts over"""
+        entry = dict(entry, fetched_at=time.time())
+        with self._lock:
+            write_atomic(self._path(url, ".json"), json.dumps(entry).encode("utf-8"))
+        return entry
+
+    def evict(self, url):
+        """Forget everything cached for a URL: validators, body and parsed frame"""
+        with self._lock:
+            for suffix in (".json", ".html.gz", ".parsed.pkl"):
+                try:
+                    os.remove(self._path(url, suffix))
+                except FileNotFoundError:
+                    pass
+
+    def load_parsed(self, url, page_hash, parser=""):
+        """Return the frame this parser version made from this exact page content, if we have it"""
+        try:
+            with open(self._path(url, ".parsed.pkl"), "rb") as f:
+                cached_hash, cached_parser, df = pickle.load(f)
+        except Exception:
+            # Unreadable, from an older cache layout, or pickled by other pandas/numpy versions
+            return None
+        return df if (cached_hash, cached_parser) == (page_hash, parser) else None
+
+    def store_parsed(self, url, page_hash, df, parser=""):
+        with self._lock:
+            write_atomic(self._path(url, ".parsed.pkl"), pickle.dumps((page_hash, parser, df)))
@@ -0,0 +1,195 @@
+"""Long-lived HTTP sessions shared by every ticker, one per host.
+
+Each host gets a requests.Session with its own keep-alive connection pool and
+cookie jar, so only the first request to a site pays the TCP+TLS handshake and
+the homepage cookie visit. Cookie jars can be persisted between runs.
+Connection setup is timed per host in scrape_metrics, with name resolution,
+the TCP connect and the TLS handshake as separate stages.
+"""
+import os
+import re
+import socket
+import threading
+import time
+from http.cookiejar import LWPCookieJar
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util import connection
+
+from scrape_metrics import METRICS
+
+def get_host(url):
+    """Return scheme://netloc, the key sessions are pooled by"""
+    parsed = urlparse(url)
+    return f"{parsed.scheme}://{parsed.netloc}"
+
+# The Timed*Connection being connected on this thread, if any
+_dialing = threading.local()
+
+def _timed_create_connection(address, *args, **kwargs):
+    """urllib3's create_connection, with name resolution and the TCP connect timed as separate stages
+
+    urllib3 resolves and connects in one call. For a Timed*Connection the
+    host is resolved here first, so a slow or failing lookup can be told apart
+    from a slow connect, and each address is then connected to in turn.
+    Other connections are passed straight through.
+    """
+    domain = getattr(_dialing, "domain", None)
+    if domain is None:
+        return _create_connection(address, *args, **kwargs)
+    host, port = address
+    with METRICS.timer("scraper_page_seconds", stage="dns", domain=domain):
+        infos = socket.getaddrinfo(host.strip("[]"), port, connection.allowed_gai_family(), socket.SOCK_STREAM)
+
+    error = OSError("getaddrinfo returns an empty list")
+    with METRICS.timer("scraper_page_seconds", stage="tcp", domain=domain):
+        for ip in dict.fromkeys(info[4][0] for info in infos):
+            try:
+                sock = _create_connection((ip, port), *args, **kwargs)
+                break
+            except OSError as e:
+                error = e
+        else:
+            raise error
+    _dialing.connected_at = time.perf_counter()
+    return sock
+
+# urllib3's connection classes look create_connection up on this module at call time
+_create_connection = getattr(connection.create_connection, "__wrapped__", connection.create_connection)
+_timed_create_connection.__wrapped__ = _create_connection
+connection.create_connection = _timed_create_connection
+
+class _TimedConnectMixin:
+    """Times a new connection's dns, tcp and (for HTTPS) tls stages, and connect for all of them"""
+
+    @property
+    def _metrics_domain(self):
+        # Label like rate_limiter.get_domain: the URL's netloc, which only carries non-default ports
+        return self.host if self.port in (None, self.default_port) else f"{self.host}:{self.port}"
+
+    def connect(self):
+        domain = self._metrics_domain
+        _dialing.domain, _dialing.connected_at = domain, None
+        try:
+            with METRICS.timer("scraper_page_seconds", stage="connect", domain=domain):
+                super().connect()
+        finally:
+            _dialing.domain = None
+        # Everything after the TCP connect is the TLS handshake (and any proxy tunnel)
+        if isinstance(self, HTTPSConnection) and _dialing.connected_at is not None:
+            METRICS.observe("scraper_page_seconds", time.perf_counter() - _dialing.connected_at,
+                            stage="tls", domain=domain)
+        METRICS.count("scraper_connections_total", domain=domain)
+
+class TimedHTTPConnection(_TimedConnectMixin, HTTPConnection):
+    pass
+
+class TimedHTTPSConnection(_TimedConnectMixin, HTTPSConnection):
+    pass
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose connections record how long each new connection took to set up"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {"http": TimedHTTPConnectionPool, "https": TimedHTTPSConnectionPool}
+
+class HostSessionPool:
+    """Thread-safe pool of keep-alive sessions keyed by host"""
+
+    def __init__(self, pool_connections=10, pool_maxsize=10, keep_alive=True,
+                 cookie_dir=None, headers_factory=None):
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.keep_alive = keep_alive
+        self.cookie_dir = cookie_dir
+        self.headers_factory = headers_factory
+        self._sessions = {}
+        self._warmed_up = set()
+        self._lock = threading.Lock()
+
+    def _cookie_file(self, host):
+        safe_name = re.sub(r'[^A-Za-z0-9.-]', '_', urlparse(host).netloc)
+        return os.path.join(self.cookie_dir, f"{safe_name}.txt")
+
+    def _create_session(self, host):
+        session = requests.Session()
+
+        # Size the urllib3 pool for the number of concurrent requests per host
+        adapter = TimedHTTPAdapter(pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+
+        # One browser identity per host so cookies and User-Agent stay consistent
+        if self.headers_factory:
+            session.headers.update(self.headers_factory())
+        session.headers["Connection"] = "keep-alive" if self.keep_alive else "close"
+
+        if self.cookie_dir:
+            jar = LWPCookieJar(self._cookie_file(host))
+            if os.path.exists(jar.filename):
+                try:
+                    jar.load(ignore_discard=True, ignore_expires=False)
+                    # Cookies from an earlier run mean the homepage visit can be skipped
+                    if len(jar):
+                        self._warmed_up.add(host)
+                except Exception as e:
+                    print(f"Could not load cookies for {host}: {e}")
+            session.cookies = jar
+
+        return session
+
+    def session_for(self, url):
+        """Return the shared session for the URL's host, creating it on first use"""
+        host = get_host(url)
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = self._sessions[host] = self._create_session(host)
+            return session
+
+    def needs_warm_up(self, url):
+        """True exactly once per host: the caller should visit the homepage to set cookies"""
+        host = get_host(url)
+        with self._lock:
+            if host in self._warmed_up:
+                return False
+            self._warmed_up.add(host)
+            return True
+
+    def save_cookies(self):
+        """Persist every host's cookie jar to cookie_dir"""
+        if not self.cookie_dir:
+            return
+        os.makedirs(self.cookie_dir, exist_ok=True)
+        with self._lock:
+            for host, session in self._sessions.items():
+                if isinstance(session.cookies, LWPCookieJar):
+                    try:
+                        session.cookies.save(ignore_discard=True)
+                    except Exception as e:
+                        print(f"Could not save cookies for {host}: {e}")
+
+    def close(self):
+        """Save cookies and close every pooled connection"""
+        self.save_cookies()
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
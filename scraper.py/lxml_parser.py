@@ -0,0 +1,117 @@
+"""lxml fast path for parse_financial_data.
+
+The document is parsed by libxml2 instead of BeautifulSoup's Python tree
+builder, walked once to collect candidates for table_extraction, and rows are
+read with precompiled XPath expressions. The result matches the BeautifulSoup
+path.
+"""
+import re
+
+try:
+    from lxml import etree, html as lxml_html
+    LXML_AVAILABLE = True
+except ImportError:
+    etree = lxml_html = None
+    LXML_AVAILABLE = False
+
+from table_extraction import JSON_SCRIPT_TYPES, RowCache, TableCandidate, select_financial_data
+
+YEAR_PATTERN = re.compile(r'\b(20[12][0-9])\b')
+
+if LXML_AVAILABLE:
+    ROW_TITLE_XPATH = etree.XPath(".//div[contains(@class, 'rowTitle') or contains(@class, 'row-title')]")
+    ROW_COLUMNS_XPATH = etree.XPath(".//div[contains(@class, 'column') or contains(@class, 'cell')]")
+    ROW_CELLS_XPATH = etree.XPath(".//*[self::td or self::th]")
+
+def _collapse_whitespace(text):
+    # BeautifulSoup stores whitespace-only strings as a single newline or space
+    if text.strip():
+        return text
+    return '\n' if '\n' in text else ' '
+
+def _text(element):
+    """Equivalent of BeautifulSoup's get_text().strip()"""
+    return ''.join(_collapse_whitespace(text) for text in element.itertext()).strip()
+
+def _single_string(element):
+    """Equivalent of BeautifulSoup's Tag.string: the text of a lone child string, else None"""
+    children = list(element)
+    if not children:
+        return element.text
+    if len(children) == 1 and not element.text and not children[0].tail:
+        child = children[0]
+        if not isinstance(child.tag, str):
+            # Comments and processing instructions count as strings in BeautifulSoup
+            return child.text
+        return _single_string(child)
+    return None
+
+def _parse_table_row(row):
+    """(title, values) for a <tr> with at least two cells, else None"""
+    cols = ROW_CELLS_XPATH(row)
+    if len(cols) < 2:
+        return None
+    return _text(cols[0]), [_text(col) for col in cols[1:]]
+
+def _parse_yahoo_row(row):
+    """(title, values) for a Yahoo Finance row div, or None if it has no title"""
+    title_divs = ROW_TITLE_XPATH(row)
+    if not title_divs:
+        return None
+    values = [_text(col) for col in ROW_COLUMNS_XPATH(row) if 'sticky' not in (col.get('class') or '')]
+    return _text(title_divs[0]), values
+
+def extract_financial_data_lxml(html_content):
+    """Find metric rows and year headers with lxml; returns (financial_data, years)"""
+    if not LXML_AVAILABLE:
+        raise ImportError("The lxml parser backend needs the lxml package")
+
+    document = lxml_html.fromstring(html_content)
+
+    # One walk over the document classifies every element the strategies need
+    yahoo_rows = None
+    tables = {}
+    row_cache = RowCache(_parse_table_row)
+    json_scripts = {script_type: [] for script_type in JSON_SCRIPT_TYPES}
+    year_cells = []
+
+    for element in document.iter('div', 'table', 'tr', 'th', 'td', 'script'):
+        tag = element.tag
+        if tag == 'div':
+            if 'row' in (element.get('class') or '').split():
+                if yahoo_rows is None:
+                    yahoo_rows = []
+                row = _parse_yahoo_row(element)
+                if row is not None:
+                    yahoo_rows.append(row)
+        elif tag == 'table':
+            tables[element] = TableCandidate(element.get('summary'), element.text_content, row_cache)
+        elif tag == 'tr':
+            # A row belongs to every table it is nested in
+            for table in element.iterancestors('table'):
+                tables[table].row_elements.append(element)
+        elif tag == 'script':
+            if element.get('type') in json_scripts:
+                json_scripts[element.get('type')].append(_single_string(element))
+        else:
+            if tag == 'th':
+                header_text = element.text_content().lower()
+                for table in element.iterancestors('table'):
+                    tables[table].header_texts.append(header_text)
+            string = _single_string(element)
+            if string and YEAR_PATTERN.search(string):
+                year_cells.append(element)
+
+    # Apply the strategies in priority order to what the walk collected
+    json_payloads = [payload for script_type in JSON_SCRIPT_TYPES for payload in json_scripts[script_type]]
+    financial_data = select_financial_data(yahoo_rows, list(tables.values()), json_payloads)
+
+    # Year headers are only needed when we found data
+    extracted_years = []
+    if financial_data:
+        for cell in year_cells:
+            year_match = YEAR_PATTERN.search(_text(cell))
+            if year_match:
+                extracted_years.append(year_match.group(1))
+
+    return financial_data, extracted_years
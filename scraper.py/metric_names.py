@@ -0,0 +1,91 @@
+"""Canonical metric names.
+
+Each site labels the same line differently ("Sales/Revenue" on MarketWatch,
+"Total Revenue" on Yahoo), and older scrapes doubled labels across a newline
+("Sales/Revenue\nSales/Revenue"). CANONICAL_METRICS gives every known metric
+an id and one display name. METRIC_INDEX, built once from the table, maps a
+normalized label to its id. normalize_metric_labels renames a parsed frame's
+rows to display names at parse time, so code downstream looks metrics up by
+exact name (METRIC_IDS) instead of matching alias lists.
+"""
+import re
+
+# id: (display name, other labels used for the same line)
+CANONICAL_METRICS = {
+    "revenue": ("Total Revenue", ["Revenue", "Revenues", "Total Revenues", "Sales", "Net Sales", "Total Sales",
+                                  "Sales/Revenue"]),
+    "revenue_growth": ("Sales Growth", ["Revenue Growth"]),
+    "cost_of_revenue": ("Cost of Revenue", ["Cost of Goods Sold (COGS) incl. D&A", "Cost of Goods Sold",
+                                            "Cost of Sales"]),
+    "gross_profit": ("Gross Profit", ["Gross Income"]),
+    "gross_profit_growth": ("Gross Income Growth", ["Gross Profit Growth"]),
+    "sga": ("SG&A Expense", ["Selling General and Administration"]),
+    "research_development": ("Research & Development", ["Research and Development"]),
+    "depreciation_amortization": ("Depreciation & Amortization Expense", [
+        "Depreciation & Amortization", "Depreciation and Amortization in Income Statement"]),
+    "operating_income": ("Operating Income", ["Operating Profit", "Income from Operations", "Operating Earnings"]),
+    "ebit": ("EBIT", ["Earnings Before Interest and Taxes"]),
+    "ebitda": ("EBITDA", ["Earnings Before Interest, Taxes, Depreciation and Amortization"]),
+    "interest_income": ("Interest Income", []),
+    "interest_expense": ("Interest Expense", []),
+    "net_interest_income": ("Net Interest Income", []),
+    "pretax_income": ("Pretax Income", ["Pre-Tax Income", "Income Before Taxes"]),
+    "income_tax": ("Income Taxes", ["Income Tax", "Tax Provision"]),
+    "net_income": ("Net Income", ["Net Profit", "Net Earnings"]),
+    "net_income_common": ("Net Income Common Stockholders", [
+        "Net Income Available to Common", "Net Income to Common Shareholders",
+        "Net Income Available to Common Shareholders"]),
+    "eps_basic": ("EPS (Basic)", ["Basic EPS"]),
+    "eps_basic_growth": ("EPS (Basic) Growth", ["EPS (Basic) Grwoth"]),
+    "eps_diluted": ("EPS (Diluted)", ["Diluted EPS"]),
+    "shares_basic": ("Basic Shares Outstanding", ["Basic Average Shares"]),
+    "shares_diluted": ("Diluted Shares Outstanding", ["Diluted Average Shares"]),
+}
+
+NON_WORD_PATTERN = re.compile(r'[^a-z0-9]+')
+
+def clean_label(label):
+    """Collapse whitespace, and a label repeated on several lines to one copy"""
+    lines = [' '.join(line.split()) for line in str(label).splitlines()]
+    lines = [line for line in lines if line]
+    if not lines:
+        return ''
+    if all(line == lines[0] for line in lines):
+        return lines[0]
+    return ' '.join(lines)
+
+def label_key(label):
+    """Case, punctuation and '&'/'and' insensitive form of a label"""
+    return NON_WORD_PATTERN.sub(' ', clean_label(label).lower().replace('&', ' and ')).strip()
+
+# Precomputed once: normalized label -> id, and display name -> id
+METRIC_INDEX = {label_key(alias): key for key, (name, aliases) in CANONICAL_METRICS.items() for alias in [name] + aliases}
+METRIC_IDS = {name: key for key, (name, _) in CANONICAL_METRICS.items()}
+
+def metric_id(label):
+    """Canonical id for a metric label, or None if it is not a known metric"""
+    return METRIC_IDS.get(label) or METRIC_INDEX.get(label_key(label))
+
+def canonical_label(label):
+    """Display name for a known metric, else the cleaned label"""
+    known = metric_id(label)
+    return CANONICAL_METRICS[known][0] if known else clean_label(label)
+
+def normalize_metric_labels(df):
+    """Rename a metric x year frame's rows to canonical display names
+
+    A row already carrying a display name keeps it. When several rows map to
+    the same metric the first takes the display name and the others keep
+    their cleaned labels, so no row is lost or merged.
+    """
+    cleaned = [clean_label(label) for label in df.index]
+    canonical = [canonical_label(label) for label in cleaned]
+    taken = {label for label in cleaned if label in METRIC_IDS}
+    labels = []
+    for label, name in zip(cleaned, canonical):
+        if name != label and name in taken:
+            name = label
+        taken.add(name)
+        labels.append(name)
+    df.index = labels
+    return df
@@ -0,0 +1,179 @@
+"""Content-addressed, compressed archive of every page the scraper fetched.
+
+Pages are stored once per sha256 of their content under objects/<aa>/<hash>
+(zstd when the zstandard package is installed, gzip otherwise), and every
+download appends a line to index.jsonl with ticker, url and timestamp; pages
+served from the HTTP cache are not downloads and are not recorded. Identical
+pages are deduplicated, and any snapshot can be replayed through the parser
+offline.
+
+    python page_archive.py stats
+    python page_archive.py import ../debug
+    python page_archive.py replay --ticker TSLA
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from atomic_files import write_atomic
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ARCHIVE_DIR = os.path.join(REPO_ROOT, "archive")
+
+CODEC_SUFFIXES = {"zstd": ".html.zst", "gzip": ".html.gz"}
+
+def _compress(data, codec):
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    return gzip.compress(data, compresslevel=9)
+
+def _decompress(data, codec):
+    if codec == "zstd":
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+class PageArchive:
+    """Deduplicating page store with a JSON-lines index of fetches"""
+
+    def __init__(self, root=ARCHIVE_DIR, codec=None):
+        self.root = root
+        self.codec = codec or ("zstd" if zstandard is not None else "gzip")
+        if self.codec == "zstd" and zstandard is None:
+            raise ValueError("zstd compression needs the zstandard package")
+        self.index_path = os.path.join(root, "index.jsonl")
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+
+    def _object_path(self, digest, codec):
+        return os.path.join(self.root, "objects", digest[:2], digest + CODEC_SUFFIXES[codec])
+
+    def _find_object(self, digest):
+        for codec in CODEC_SUFFIXES:
+            path = self._object_path(digest, codec)
+            if os.path.exists(path):
+                return path, codec
+        return None, None
+
+    def put(self, html_content, ticker=None, url=None, fetched_at=None):
+        """Archive a page and record the fetch; returns the content hash"""
+        data = html_content.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+
+        with self._lock:
+            path, codec = self._find_object(digest)
+            if path is None:
+                codec = self.codec
+                path = self._object_path(digest, codec)
+                write_atomic(path, _compress(data, codec))
+
+            record = {
+                "hash": digest,
+                "ticker": ticker.upper() if ticker else None,
+                "url": url,
+                "fetched_at": fetched_at if fetched_at is not None else time.time(),
+                "size": len(data),
+                "stored_size": os.path.getsize(path),
+                "codec": codec,
+            }
+            with open(self.index_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+
+        return digest
+
+    def get(self, digest):
+        """Return the page text for a content hash"""
+        path, codec = self._find_object(digest)
+        if path is None:
+            raise KeyError(digest)
+        with open(path, "rb") as f:
+            return _decompress(f.read(), codec).decode("utf-8")
+
+    def snapshots(self, ticker=None, url=None, since=None):
+        """Iterate index records, optionally filtered by ticker, url or fetch time"""
+        if not os.path.exists(self.index_path):
+            return
+        with open(self.index_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if ticker and record.get("ticker") != ticker.upper():
+                    continue
+                if url and record.get("url") != url:
+                    continue
+                if since and record.get("fetched_at", 0) < since:
+                    continue
+                yield record
+
+    def replay(self, parse_fn, ticker=None, url=None, since=None):
+        """Parse archived snapshots offline; yields (record, parse_fn(html, url=record's url))"""
+        for record in self.snapshots(ticker=ticker, url=url, since=since):
+            yield record, parse_fn(self.get(record["hash"]), url=record.get("url"))
+
+    def stats(self):
+        """Fetch count, unique pages and raw vs stored byte totals"""
+        fetches = 0
+        raw_bytes = 0
+        unique = {}
+        for record in self.snapshots():
+            fetches += 1
+            raw_bytes += record["size"]
+            unique[record["hash"]] = record["stored_size"]
+        return {
+            "fetches": fetches,
+            "unique_pages": len(unique),
+            "raw_bytes": raw_bytes,
+            "stored_bytes": sum(unique.values()),
+        }
+
+    def import_debug_pages(self, debug_dir):
+        """Archive existing debug_html_<name>.html dumps, using <name> as the ticker"""
+        imported = 0
+        for name in sorted(os.listdir(debug_dir)):
+            match = re.match(r"debug_html_(.+)\.html$", name)
+            if not match:
+                continue
+            path = os.path.join(debug_dir, name)
+            with open(path, encoding="utf-8") as f:
+                self.put(f.read(), ticker=match.group(1), url=None, fetched_at=os.path.getmtime(path))
+            imported += 1
+        return imported
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect and replay the scraped page archive")
+    parser.add_argument("--archive-dir", default=ARCHIVE_DIR)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("stats", help="Show fetch count and disk footprint")
+    import_parser = subparsers.add_parser("import", help="Archive existing debug_html_*.html dumps")
+    import_parser.add_argument("debug_dir")
+    replay_parser = subparsers.add_parser("replay", help="Re-parse archived snapshots offline")
+    replay_parser.add_argument("--ticker")
+    replay_parser.add_argument("--url")
+    args = parser.parse_args(argv)
+
+    archive = PageArchive(args.archive_dir)
+    if args.command == "stats":
+        stats = archive.stats()
+        ratio = stats["stored_bytes"] / stats["raw_bytes"] if stats["raw_bytes"] else 0
+        print(f"{stats['fetches']} fetches, {stats['unique_pages']} unique pages, "
+              f"{stats['raw_bytes'] / 1e6:.1f} MB raw -> {stats['stored_bytes'] / 1e6:.1f} MB stored ({ratio:.1%})")
+    elif args.command == "import":
+        print(f"Imported {archive.import_debug_pages(args.debug_dir)} pages")
+    elif args.command == "replay":
+        from financial_scraper import parse_financial_data
+        for record, df in archive.replay(parse_financial_data, ticker=args.ticker, url=args.url):
+            print(f"{record['ticker']} {record['url']} {record['hash'][:12]}: {df.shape[0]} metrics x {df.shape[1]} years")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""CPU parse stage run in worker processes, fed by a bounded queue.
+
+Parsing a statement page is CPU-bound, so parsing it inline after each fetch
+leaves the network idle and uses one core. ParseStage takes fetched pages from
+the fetch loop through a bounded queue and parses them in a ProcessPoolExecutor
+while the loop goes on fetching. When the queue is full, put() blocks, so the
+fetch stage never runs more than a queue's worth of pages ahead of the
+parsers. Parsed frames come back through results(), in completion order,
+together with the job key the caller passed in. The time from handing a page
+to the pool until its result is back is recorded as the page's parse stage in
+scrape_metrics, and the time it waited in the queue as parse_queue, both with
+the labels (the ticker) in effect where the page was put().
+
+Workers are started by a fork server (or spawned where there is none) rather
+than forked: the pool starts them from the feeder thread while other threads
+may hold locks, and a forked child would inherit those locks held.
+"""
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from rate_limiter import get_domain
+from scrape_metrics import METRICS
+
+def worker_context():
+    """forkserver where the platform has it, else spawn; never a plain fork of this threaded process"""
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+class ParseStage:
+    """Bounded queue of pages parsed by parse_fn(html_content, url=url) in worker processes"""
+
+    def __init__(self, parse_fn, workers=None, max_queued=None):
+        self.parse_fn = parse_fn
+        self.workers = workers or os.cpu_count() or 1
+        self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=worker_context())
+        self._pages = queue.Queue(maxsize=max_queued or 2 * self.workers)
+        self._results = queue.Queue()
+        # At most one page per worker is handed to the pool; the rest wait in the bounded queue
+        self._slots = threading.Semaphore(self.workers)
+        self._outstanding = 0
+        self._feeder = threading.Thread(target=self._feed, name="parse-feeder", daemon=True)
+        self._feeder.start()
+
+    @property
+    def outstanding(self):
+        """Pages put() whose result has not been taken from results() yet"""
+        return self._outstanding
+
+    def put(self, job, html_content, url):
+        """Queue a page for parsing; blocks while the queue is full"""
+        self._outstanding += 1
+        self._pages.put((job, html_content, url, time.perf_counter(), METRICS.context_labels()))
+
+    def _feed(self):
+        while True:
+            item = self._pages.get()
+            if item is None:
+                return
+            job, html_content, url, queued_at, labels = item
+            self._slots.acquire()
+            started_at = time.perf_counter()
+            METRICS.observe("scraper_page_seconds", started_at - queued_at, stage="parse_queue", domain=get_domain(url),
+                            **labels)
+            try:
+                future = self._executor.submit(self.parse_fn, html_content, url=url)
+            except Exception as e:
+                self._slots.release()
+                self._results.put((job, None, e))
+                continue
+            future.add_done_callback(lambda future, job=job, url=url, started_at=started_at, labels=labels:
+                                     self._finished(job, future, url, started_at, labels))
+
+    def _finished(self, job, future, url, started_at, labels):
+        self._slots.release()
+        METRICS.observe("scraper_page_seconds", time.perf_counter() - started_at, stage="parse", domain=get_domain(url),
+                        **labels)
+        try:
+            self._results.put((job, future.result(), None))
+        except Exception as e:
+            self._results.put((job, None, e))
+
+    def results(self, block=False):
+        """Yield (job, frame, error) for finished pages; with block, wait for at least one"""
+        while self._outstanding:
+            try:
+                result = self._results.get(block=block)
+            except queue.Empty:
+                return
+            self._outstanding -= 1
+            block = False
+            yield result
+
+    def close(self):
+        self._pages.put(None)
+        self._feeder.join()
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,171 @@
+"""Per-domain token-bucket rate limiting and a politeness scheduler.
+
+Every fetch draws a token from its domain's bucket, so the requests-per-second
+budget holds no matter how many tickers or threads share the limiter. 429/503
+responses block the whole domain for the Retry-After period (or an exponential
+backoff). DomainScheduler interleaves queued fetches across domains, always
+running the one whose domain is ready soonest.
+"""
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+# Requests per second allowed for each site the scraper targets
+DEFAULT_DOMAIN_RATES = {
+    "finance.yahoo.com": 0.5,
+    "marketwatch.com": 0.5,
+    "macrotrends.net": 0.25,
+    "wsj.com": 0.5,
+}
+DEFAULT_RATE = 0.5
+
+RETRY_STATUS_CODES = (429, 503)
+
+def get_domain(url):
+    """Return the host part of a URL (or the value itself if it is already a host)"""
+    return urlparse(url).netloc.lower() if "://" in url else url.lower()
+
+def parse_retry_after(value):
+    """Convert a Retry-After header (seconds or HTTP date) to seconds, or None"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, up to `burst` saved"""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.blocked_until = 0.0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def ready_in(self):
+        """Seconds until a token is available, without taking it"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            wait = 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+            return max(wait, self.blocked_until - now)
+
+    def reserve(self):
+        """Take a token now and return how long the caller must wait before using it"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= 1
+            wait = 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+            return max(wait, self.blocked_until - now)
+
+    def block_for(self, seconds):
+        """Stop handing out usable tokens for the next `seconds`"""
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+class DomainRateLimiter:
+    """One token bucket per domain, with Retry-After aware backoff"""
+
+    def __init__(self, rates=None, default_rate=DEFAULT_RATE, burst=1, jitter=0.25,
+                 backoff_base=5.0, backoff_max=300.0):
+        self.rates = dict(DEFAULT_DOMAIN_RATES if rates is None else rates)
+        self.default_rate = default_rate
+        self.burst = burst
+        self.jitter = jitter
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def rate_for(self, domain):
+        # Match on domain suffix so "marketwatch.com" covers "www.marketwatch.com"
+        for configured, rate in self.rates.items():
+            if domain == configured or domain.endswith("." + configured):
+                return rate
+        return self.default_rate
+
+    def bucket(self, url):
+        domain = get_domain(url)
+        with self._lock:
+            bucket = self._buckets.get(domain)
+            if bucket is None:
+                bucket = self._buckets[domain] = TokenBucket(self.rate_for(domain), self.burst)
+            return bucket
+
+    def ready_in(self, url):
+        return self.bucket(url).ready_in()
+
+    def reserve(self, url):
+        """Take a token for the URL's domain; returns the (jittered) seconds to wait"""
+        wait = self.bucket(url).reserve()
+        if self.jitter:
+            wait += random.uniform(0, self.jitter)
+        return wait
+
+    def acquire(self, url):
+        """Block until a request to the URL's domain is allowed"""
+        wait = self.reserve(url)
+        if wait > 0:
+            time.sleep(wait)
+
+    def backoff(self, url, retry_after=None, attempt=0):
+        """Block the domain after a 429/503 and return the delay applied"""
+        delay = parse_retry_after(retry_after)
+        if delay is None:
+            delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        delay = min(delay, self.backoff_max)
+        self.bucket(url).block_for(delay)
+        return delay
+
+class DomainScheduler:
+    """Runs queued fetch tasks, interleaving domains so none of them sits idle
+
+    Each task is a callable taking the URL; tasks may submit follow-up work
+    (e.g. the next URL in a ticker's fallback chain) while the scheduler runs.
+    """
+
+    def __init__(self, limiter):
+        self.limiter = limiter
+        self._queues = OrderedDict()
+
+    def submit(self, url, task):
+        self._queues.setdefault(get_domain(url), deque()).append((url, task))
+
+    def _next_domain(self):
+        # The domain whose bucket is ready soonest; ties go to the least recently served
+        waiting = [(self.limiter.ready_in(domain), domain) for domain, queue in self._queues.items() if queue]
+        if not waiting:
+            return None, 0.0
+        wait, domain = min(waiting, key=lambda item: item[0])
+        return domain, wait
+
+    def run(self):
+        while True:
+            domain, wait = self._next_domain()
+            if domain is None:
+                break
+            if wait > 0:
+                time.sleep(wait)
+
+            url, task = self._queues[domain].popleft()
+            # Rotate the domain to the back so equal-wait domains take turns
+            self._queues.move_to_end(domain)
+            task(url)
@@ -0,0 +1,163 @@
+"""Timers and counters for a scrape run, exportable as JSON lines or Prometheus text.
+
+Every stage of a fetch is timed per domain and ticker under scraper_page_seconds:
+connect (all of a new connection's setup) and, within it, dns (name
+resolution), tcp (the TCP connect) and tls (the handshake, HTTPS only),
+homepage (the cookie visit), delay (the human-like pause), rate_limit_wait
+(waiting for the domain's token), request (send until the response headers,
+including any connect), download (reading the body) and parse. Per-ticker work (analyze, save, store)
+is timed under scraper_ticker_seconds. Counters cover requests by status,
+bytes downloaded, retries, cache results, new connections and ticker outcomes.
+
+The registry is process-wide (METRICS) so code deep in the fetch path can
+record without having it passed in; it is thread-safe. The ticker label is
+not passed down either: the scrape loops wrap each ticker's work in
+METRICS.labels(ticker=...), a context variable, so timings recorded on that
+thread or asyncio task (and in threads it starts with asyncio.to_thread)
+carry it.
+"""
+import contextvars
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+from atomic_files import write_atomic
+
+METRIC_HELP = {
+    "scraper_page_seconds": "Time spent per fetch/parse stage, by domain and ticker",
+    "scraper_ticker_seconds": "Time spent per analysis stage, by ticker",
+    "scraper_requests_total": "HTTP requests by domain and status code",
+    "scraper_bytes_downloaded_total": "Response body bytes downloaded, by domain",
+    "scraper_retries_total": "Requests retried after a 429/503, by domain and status code",
+    "scraper_cache_total": "HTTP cache results: fresh, revalidated (304), changed (refetched) or miss",
+    "scraper_connections_total": "New HTTP connections opened, by domain",
+    "scraper_tickers_total": "Tickers finished, by result",
+}
+
+# Labels added to every timing recorded in the current context (see Metrics.labels)
+_context_labels = contextvars.ContextVar("scraper_metric_labels", default={})
+
+def _label_key(labels):
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+def _prometheus_labels(labels):
+    if not labels:
+        return ""
+    escaped = [(name, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")) for name, value in labels]
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+class Metrics:
+    """Thread-safe counters and timers keyed by metric name and labels"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        # (name, labels) -> [count, total seconds, max seconds]
+        self._timers = {}
+
+    def count(self, name, value=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        key = (name, _label_key(dict(_context_labels.get(), **labels)))
+        with self._lock:
+            timer = self._timers.get(key)
+            if timer is None:
+                self._timers[key] = [1, seconds, seconds]
+            else:
+                timer[0] += 1
+                timer[1] += seconds
+                timer[2] = max(timer[2], seconds)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Time the block (also when it raises) and record it under name/labels"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    @contextmanager
+    def labels(self, **labels):
+        """Add these labels (the ones not None) to every timing recorded in the block's context"""
+        token = _context_labels.set(dict(_context_labels.get(),
+                                         **{name: value for name, value in labels.items() if value is not None}))
+        try:
+            yield
+        finally:
+            _context_labels.reset(token)
+
+    def context_labels(self):
+        """The labels METRICS.labels() set for the current context, to record work finished elsewhere"""
+        return dict(_context_labels.get())
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._timers.clear()
+
+    def records(self):
+        """One dict per series: name, type ("counter" or "timer"), labels and values"""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            timers = sorted(self._timers.items())
+        records = [{"name": name, "type": "counter", "labels": dict(labels), "value": value}
+                   for (name, labels), value in counters]
+        records += [{"name": name, "type": "timer", "labels": dict(labels), "count": count,
+                     "sum": total, "max": longest}
+                    for (name, labels), (count, total, longest) in timers]
+        return records
+
+    def to_jsonl(self):
+        timestamp = time.time()
+        return "".join(json.dumps(dict(record, timestamp=timestamp)) + "\n" for record in self.records())
+
+    def to_prometheus(self):
+        """Prometheus text exposition format; timers become summaries (_count/_sum) plus a _max gauge"""
+        families = {}
+        for record in self.records():
+            families.setdefault(record["name"], []).append(record)
+
+        lines = []
+        for name, records in families.items():
+            if name in METRIC_HELP:
+                lines.append(f"# HELP {name} {METRIC_HELP[name]}")
+            if records[0]["type"] == "counter":
+                lines.append(f"# TYPE {name} counter")
+                lines += [f"{name}{_prometheus_labels(sorted(r['labels'].items()))} {r['value']}" for r in records]
+                continue
+            lines.append(f"# TYPE {name} summary")
+            for record in records:
+                labels = _prometheus_labels(sorted(record["labels"].items()))
+                lines.append(f"{name}_count{labels} {record['count']}")
+                lines.append(f"{name}_sum{labels} {record['sum']:.6f}")
+            lines.append(f"# TYPE {name}_max gauge")
+            lines += [f"{name}_max{_prometheus_labels(sorted(r['labels'].items()))} {r['max']:.6f}" for r in records]
+        return "\n".join(lines) + "\n"
+
+    def write(self, path, fmt=None):
+        """Write the metrics to path, as "prometheus" for *.prom files and JSON lines otherwise"""
+        if fmt is None:
+            fmt = "prometheus" if path.endswith((".prom", ".txt")) else "jsonl"
+        write_atomic(path, self.to_prometheus() if fmt == "prometheus" else self.to_jsonl())
+        return path
+
+    def print_summary(self, top=10):
+        """Print the stages that took the most time in total"""
+        timers = [record for record in self.records() if record["type"] == "timer"]
+        if not timers:
+            return
+        timers.sort(key=lambda record: record["sum"], reverse=True)
+        print(f"\n{'stage':<18}{'labels':<32}{'count':>7}{'total s':>10}{'mean ms':>10}{'max ms':>10}")
+        for record in timers[:top]:
+            labels = dict(record["labels"])
+            stage = labels.pop("stage", record["name"])
+            label_text = ",".join(value for _, value in sorted(labels.items()))
+            print(f"{stage:<18}{label_text:<32}{record['count']:>7}{record['sum']:>10.2f}"
+                  f"{record['sum'] / record['count'] * 1000:>10.1f}{record['max'] * 1000:>10.1f}")
+
+METRICS = Metrics()
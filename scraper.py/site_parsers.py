@@ -0,0 +1,165 @@
+"""Site-specific parsers, selected by the host of the page URL.
+
+Each plugin reads exactly one site's layout with targeted XPath: it takes the
+year labels from that site's own header row and the metric label from its own
+label cell, so the columns line up with the real fiscal years. A plugin that
+finds nothing returns an empty result instead of falling through to the
+heuristics in table_extraction, so a layout change on a known site shows up as
+a warning rather than as plausible-looking wrong data. The heuristic chain is
+only used for hosts without a plugin.
+
+Plugins return (rows, years): rows maps a metric label to its values, aligned
+with years.
+"""
+import re
+
+from embedded_data import extract_macrotrends_data
+from lxml_parser import LXML_AVAILABLE, _text
+from rate_limiter import get_domain
+
+if LXML_AVAILABLE:
+    from lxml import etree, html as lxml_html
+
+    MARKETWATCH_TABLE_XPATH = etree.XPath("//table[@aria-label='Financials - data table']")
+    MARKETWATCH_LABEL_XPATH = etree.XPath("./td[1]/div[contains(@class, 'fixed--cell')]")
+    WSJ_TABLE_XPATH = etree.XPath("//table[contains(concat(' ', @class, ' '), ' cr_dataTable ')]")
+    YAHOO_HEADER_XPATH = etree.XPath(
+        "(//div[contains(concat(' ', @class, ' '), ' tableHeader ')])[1]"
+        "//div[contains(concat(' ', @class, ' '), ' column ')]")
+    YAHOO_ROW_XPATH = etree.XPath(
+        "//div[contains(concat(' ', @class, ' '), ' tableBody ')]//div[contains(concat(' ', @class, ' '), ' row ')]")
+    YAHOO_TITLE_XPATH = etree.XPath(".//div[contains(@class, 'rowTitle')]")
+    YAHOO_COLUMN_XPATH = etree.XPath("./div[contains(concat(' ', @class, ' '), ' column ')]")
+    TABLE_ROWS_XPATH = etree.XPath("./thead/tr | ./tbody/tr | ./tr")
+    ROW_CELLS_XPATH = etree.XPath("./th | ./td")
+
+YEAR_LABEL_PATTERN = re.compile(r'^(?:FY\s*)?(20\d{2})$')
+YAHOO_DATE_PATTERN = re.compile(r'^\d{1,2}/\d{1,2}/(\d{4})$')
+YAHOO_UNITS_PATTERN = re.compile(r'All numbers in (thousands|millions)')
+YAHOO_UNIT_SCALES = {'thousands': 1e3, 'millions': 1e6}
+# Per-share amounts and rates are shown as they are, not in the page's units
+YAHOO_UNSCALED_PATTERN = re.compile(r'\bEPS\b|Per Share|\bRate\b', re.IGNORECASE)
+
+SITE_PARSERS = {}
+
+def register_site_parser(*domains, needs_lxml=True):
+    """Register a parser for pages served from the given domains (and their subdomains)
+
+    Without lxml, plugins that need it are left out and their sites go through
+    the heuristic chain instead.
+    """
+    def decorator(parse):
+        if needs_lxml and not LXML_AVAILABLE:
+            return parse
+        for domain in domains:
+            SITE_PARSERS[domain] = parse
+        return parse
+    return decorator
+
+def get_site_parser(url):
+    """Return (domain, parser) for a URL's host, or (None, None) if no plugin covers it"""
+    if not url:
+        return None, None
+    host = get_domain(url)
+    for domain, parse in SITE_PARSERS.items():
+        if host == domain or host.endswith("." + domain):
+            return domain, parse
+    return None, None
+
+def _table_years(header_cells):
+    """Column index -> year for the header cells that hold a year label"""
+    years = {}
+    for index, cell in enumerate(header_cells):
+        match = YEAR_LABEL_PATTERN.match(_text(cell))
+        if match:
+            years[index] = match.group(1)
+    return years
+
+def _read_year_table(table, label_for):
+    """(rows, years) from a table whose header row labels some columns with years"""
+    table_rows = TABLE_ROWS_XPATH(table)
+    if not table_rows:
+        return {}, []
+    year_columns = _table_years(ROW_CELLS_XPATH(table_rows[0]))
+    if not year_columns:
+        return {}, []
+
+    rows = {}
+    for row in table_rows[1:]:
+        cells = ROW_CELLS_XPATH(row)
+        if len(cells) <= max(year_columns):
+            continue
+        label = label_for(row, cells)
+        if label:
+            rows[label] = [_text(cells[index]) for index in year_columns]
+    return rows, list(year_columns.values())
+
+@register_site_parser("marketwatch.com")
+def parse_marketwatch(html_content):
+    """MarketWatch financials table: year header cells, label in the fixed first column"""
+    document = lxml_html.fromstring(html_content)
+    tables = MARKETWATCH_TABLE_XPATH(document)
+    if not tables:
+        return {}, []
+
+    def label_for(row, cells):
+        # The label cell repeats the label in a second div for the scrolled view
+        label_divs = MARKETWATCH_LABEL_XPATH(row)
+        return _text(label_divs[0]) if label_divs else _text(cells[0])
+
+    return _read_year_table(tables[0], label_for)
+
+@register_site_parser("wsj.com")
+def parse_wsj(html_content):
+    """WSJ financials tables: year header cells, label in the first cell of each row"""
+    document = lxml_html.fromstring(html_content)
+    rows = {}
+    years = []
+    for table in WSJ_TABLE_XPATH(document):
+        # Only the table's own cells: the trend column nests sparkline tables
+        table_rows, table_years = _read_year_table(table, lambda row, cells: _text(cells[0]))
+        if table_rows and (not years or table_years == years):
+            rows.update(table_rows)
+            years = table_years
+    return rows, years
+
+@register_site_parser("finance.yahoo.com")
+def parse_yahoo(html_content):
+    """Yahoo Finance statement grid: dated header columns, one div.row per metric"""
+    document = lxml_html.fromstring(html_content)
+
+    # Header columns read "Breakdown", "TTM", "12/31/2024", ...; keep the fiscal years
+    year_columns = {}
+    for index, column in enumerate(YAHOO_HEADER_XPATH(document)):
+        match = YAHOO_DATE_PATTERN.match(_text(column))
+        if match:
+            year_columns[index] = match.group(1)
+    if not year_columns:
+        return {}, []
+
+    rows = {}
+    for row in YAHOO_ROW_XPATH(document):
+        titles = YAHOO_TITLE_XPATH(row)
+        columns = YAHOO_COLUMN_XPATH(row)
+        if not titles or len(columns) <= max(year_columns):
+            continue
+        rows[_text(titles[0])] = [_text(columns[index]) for index in year_columns]
+
+    # The grid is "All numbers in thousands"; scale to units so it matches the embedded timeseries
+    units = YAHOO_UNITS_PATTERN.search(html_content)
+    if units:
+        scale = YAHOO_UNIT_SCALES[units.group(1)]
+        for label, values in rows.items():
+            if not YAHOO_UNSCALED_PATTERN.search(label):
+                rows[label] = [_scale_cell(value, scale) for value in values]
+    return rows, list(year_columns.values())
+
+def _scale_cell(text, scale):
+    """'28,167,000' -> '28167000000.0' in thousands; cells that are not plain numbers are kept"""
+    try:
+        return repr(float(text.replace(',', '')) * scale)
+    except ValueError:
+        return text
+
+# Macrotrends draws its grid from an embedded array; the extractor lives with the other embedded readers
+register_site_parser("macrotrends.net", needs_lxml=False)(extract_macrotrends_data)
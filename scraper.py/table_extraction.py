@@ -0,0 +1,134 @@
+"""Strategy selection shared by the BeautifulSoup and lxml parse paths.
+
+The parsers walk the document once and classify what they meet into
+candidates: Yahoo-style row divs, tables (with their summary, header texts and
+rows), JSON script payloads and year header cells. Each table and row is
+processed at most once, however many strategies look at it. The strategy
+priority (Yahoo rows, SEC tables, MarketWatch/WSJ tables, any financial table,
+embedded JSON) is applied here, at the end, instead of by re-scanning the
+document per strategy.
+"""
+import json
+import re
+
+DIGIT_PATTERN = re.compile(r'\d')
+
+FINANCIAL_TERMS = ['revenue', 'income', 'profit', 'sales', 'earnings', 'ebitda', 'assets', 'liabilities']
+SKIPPED_TITLES = ['item', 'description', 'all values in thousands']
+STATEMENT_SUMMARY_WORDS = ('income', 'statement', 'financial')
+JSON_SCRIPT_TYPES = ('application/ld+json', 'application/json')
+
+class RowCache:
+    """Parses each <tr> once, even when it belongs to several nested tables"""
+
+    def __init__(self, parse_row):
+        self.parse_row = parse_row
+        self._rows = {}
+
+    def get(self, row_element):
+        key = id(row_element)
+        if key not in self._rows:
+            self._rows[key] = self.parse_row(row_element)
+        return self._rows[key]
+
+class TableCandidate:
+    """A <table> seen during the document walk, classified lazily and only once"""
+
+    def __init__(self, summary, get_text, row_cache):
+        self.summary = (summary or '').lower()
+        self.header_texts = []
+        self.row_elements = []
+        self._get_text = get_text
+        self._row_cache = row_cache
+        self._text = None
+        self._rows = None
+
+    @property
+    def is_statement(self):
+        """SEC Edgar-style table: the summary attribute names a statement"""
+        return any(word in self.summary for word in STATEMENT_SUMMARY_WORDS)
+
+    @property
+    def has_financial_headers(self):
+        """MarketWatch/WSJ-style table: a header cell mentions revenue or income"""
+        return any('revenue' in text or 'income' in text for text in self.header_texts)
+
+    @property
+    def text(self):
+        if self._text is None:
+            self._text = self._get_text().lower()
+        return self._text
+
+    @property
+    def rows(self):
+        """(title, values) for every row with at least two cells"""
+        if self._rows is None:
+            self._rows = [row for row in map(self._row_cache.get, self.row_elements) if row is not None]
+        return self._rows
+
+def select_financial_data(yahoo_rows, tables, json_payloads):
+    """Apply the extraction strategies in priority order to the collected candidates
+
+    yahoo_rows is None when the page has no Yahoo-style row divs, otherwise a
+    list of (title, values). json_payloads are the raw script texts, in the
+    order they should be tried.
+    """
+    financial_data = {}
+
+    # First, check for Yahoo Finance structure
+    if yahoo_rows is not None:
+        print("Checking Yahoo Finance table structure")
+        for title, values in yahoo_rows:
+            if values:
+                financial_data[title] = values
+
+    # Check for SEC Edgar-style tables
+    if not financial_data:
+        print("Checking for SEC Edgar-style tables")
+        for table in tables:
+            if table.is_statement:
+                for title, values in table.rows:
+                    if title and values:
+                        financial_data[title] = values
+
+    # Check for MarketWatch/WSJ style tables
+    if not financial_data:
+        print("Checking for MarketWatch/WSJ style tables")
+        for table in tables:
+            if table.has_financial_headers:
+                for title, values in table.rows:
+                    if title and values:
+                        financial_data[title] = values
+
+    # Try to find data in any table with financial-looking data
+    if not financial_data:
+        print("Trying generic approach to find financial data in tables")
+        for table in tables:
+            # Only process tables that look like they contain financial data
+            if not any(term in table.text for term in FINANCIAL_TERMS):
+                continue
+            for title, values in table.rows:
+                # Skip empty title rows or headers
+                if not title or title.lower() in SKIPPED_TITLES:
+                    continue
+                # Only include rows with numeric values
+                if values and any(DIGIT_PATTERN.search(value) for value in values):
+                    financial_data[title] = values
+
+    # Look for structured data in script tags (many sites include JSON data)
+    if not financial_data:
+        print("Looking for structured JSON data in script tags")
+        for payload in json_payloads:
+            try:
+                data = json.loads(payload)
+            except (TypeError, ValueError):
+                continue
+            if isinstance(data, dict) and ('financials' in data or 'income_statement' in data):
+                print("Found structured financial data in JSON!")
+                fin_data = data.get('financials', data.get('income_statement', {}))
+                if isinstance(fin_data, dict):
+                    for key, values in fin_data.items():
+                        if isinstance(values, list) and len(values) > 0:
+                            financial_data[key] = values
+
+    return financial_data
@@ -0,0 +1,149 @@
+"""Checks that the vectorized analysis steps match the original implementations.
+
+The originals are kept in benchmarks.py (clean_cellwise and friends). Each
+test compares old and new on the frames parsed from the saved pages in
+debug/, and on small frames built for the edge cases.
+
+    python -m pytest scraper.py
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks import (clean_cellwise, growth_rowwise, load_pages, page_url, ratios_looped, raw_page_frames,
+                        same_values)
+from financial_scraper import (calculate_financial_ratios, calculate_growth_rates, calculate_panel_ratios,
+                               clean_dataframe, clean_value, clean_values, parse_financial_data, stack_panel)
+
+EDGE_CELLS = ["1,234", "$1.2B", "(45)", "(1.5M)", "12.5%", "-3.2%", "3T", "4.5M", "7K", "1.2b", "2m", "€3,000",
+              " 12 ", "£ 1 000", "--", "-", "", "N/A", "abc", "1.5.5", "(12)%", "0", "-0.0"]
+
+@pytest.fixture(scope="module")
+def pages():
+    return load_pages()
+
+@pytest.fixture(scope="module")
+def page_frames(pages):
+    """Cleaned frames as the scraper builds them: embedded data and site parsers first"""
+    frames = {}
+    for name, html in pages.items():
+        df = parse_financial_data(html, url=page_url(html))
+        if not df.empty:
+            frames[name] = clean_dataframe(df)
+    if not frames:
+        pytest.skip("no saved pages in debug/")
+    return frames
+
+@pytest.fixture(scope="module")
+def raw_frames(pages):
+    frames = raw_page_frames(pages)
+    if not frames:
+        pytest.skip("no saved pages in debug/")
+    return frames
+
+def test_clean_values_matches_clean_value_on_edge_cells():
+    expected = np.array([np.nan if clean_value(cell) is None else clean_value(cell) for cell in EDGE_CELLS])
+    assert np.array_equal(clean_values(EDGE_CELLS), expected, equal_nan=True)
+
+def test_clean_dataframe_matches_cellwise_on_saved_pages(raw_frames):
+    for df in raw_frames:
+        assert same_values(clean_cellwise(df), clean_dataframe(df))
+
+def test_clean_dataframe_handles_repeated_cells_and_missing_values():
+    df = pd.DataFrame({"2023": ["1.2B", "--", None, "1.2B"], "2022": ["(5)", "5%", "5%", np.nan]})
+    cleaned = clean_dataframe(df)
+    assert same_values(cleaned, pd.DataFrame({"2023": [1.2e9, np.nan, np.nan, 1.2e9],
+                                              "2022": [-5.0, 0.05, 0.05, np.nan]}))
+
+def test_clean_dataframe_keeps_numeric_cells():
+    df = pd.DataFrame({"2023": [1.5, 2.0], "2022": [np.int64(3), "4K"]})
+    assert same_values(clean_dataframe(df), pd.DataFrame({"2023": [1.5, 2.0], "2022": [3.0, 4000.0]}))
+    # Cleaning is idempotent
+    assert same_values(clean_dataframe(clean_dataframe(df)), clean_dataframe(df))
+
+def test_clean_values_treats_bools_as_missing():
+    assert np.isnan(clean_values([True, False])).all()
+
+def test_growth_matches_rowwise_on_saved_pages(raw_frames):
+    for df in raw_frames:
+        df = clean_dataframe(df)
+        growth = calculate_growth_rates(df)
+        assert list(growth.columns) == list(growth_rowwise(df).columns)
+        assert same_values(growth_rowwise(df), growth)
+
+def test_growth_masks_zero_and_missing_previous_years():
+    df = pd.DataFrame({"2023": [110.0, 5.0, np.nan, 0.0, -50.0],
+                       "2022": [100.0, 0.0, 10.0, 10.0, -100.0],
+                       "2021": [np.nan, 1.0, 20.0, 0.0, 50.0]}, index=list("abcde"))
+    growth = calculate_growth_rates(df)
+    assert same_values(growth, growth_rowwise(df))
+    assert np.isnan(growth.loc["b", "Growth 2023"]) and np.isnan(growth.loc["a", "Growth 2022"])
+    assert growth.loc["d", "Growth 2023"] == -100.0
+
+def test_growth_needs_two_years():
+    assert calculate_growth_rates(pd.DataFrame({"2023": [1.0]})).empty
+    assert calculate_growth_rates(pd.DataFrame()).empty
+
+def test_growth_of_a_panel_matches_each_ticker(raw_frames):
+    frames = {f"T{position}": clean_dataframe(df) for position, df in enumerate(raw_frames)}
+    growth = calculate_growth_rates(stack_panel(frames))
+    for ticker, df in frames.items():
+        # The panel spans every ticker's years; compare the columns this ticker has
+        expected = growth_rowwise(df)
+        assert same_values(growth.loc[ticker][expected.columns], expected)
+
+def assert_same_ratios(ratios, expected):
+    assert list(ratios.index) == list(expected.index)
+    assert same_values(ratios, expected)
+
+def test_ratios_match_the_original_loop_on_saved_pages(page_frames):
+    for df in page_frames.values():
+        assert_same_ratios(calculate_financial_ratios(df), ratios_looped(df))
+
+def test_ratios_mask_zero_and_missing_revenue():
+    df = pd.DataFrame({"2023": [0.0, 5.0, 1.0], "2022": [np.nan, 4.0, 1.0], "2021": [200.0, np.nan, 0.0]},
+                      index=["Total Revenue", "Gross Profit", "Net Income"])
+    ratios = calculate_financial_ratios(df)
+    assert_same_ratios(ratios, ratios_looped(df))
+    assert ratios.loc["Gross Profit Margin (%)"].isna().tolist() == [True, True, True]
+    assert ratios.loc["Net Income Margin (%)", "2021"] == 0.0
+
+@pytest.mark.parametrize("labels", [
+    ["Net Sales", "Gross Income", "Operating Profit", "Net Earnings", "EBITDA"],
+    ["Revenue", "Gross Profit", "Income from Operations", "Net Profit",
+     "Earnings Before Interest, Taxes, Depreciation and Amortization"],
+    ["Sales", "Cost of Revenue", "Operating Earnings", "Net Income", "Other"],
+])
+def test_ratios_resolve_alternate_aliases(labels):
+    df = pd.DataFrame({"2023": [200.0, 50.0, 30.0, 20.0, 40.0], "2022": [100.0, 20.0, np.nan, 10.0, 0.0]},
+                      index=labels)
+    assert_same_ratios(calculate_financial_ratios(df), ratios_looped(df))
+
+def test_ratios_prefer_the_display_name_row():
+    df = pd.DataFrame({"2023": [400.0, 200.0, 100.0]}, index=["Sales", "Total Revenue", "Gross Profit"])
+    assert calculate_financial_ratios(df).loc["Gross Profit Margin (%)", "2023"] == 50.0
+
+def test_ratio_inputs_resolve_by_canonical_id():
+    # A margin reported as a percentage, and income to common holders, are not ratio inputs
+    df = pd.DataFrame({"2023": [200.0, 30.0, 20.0]},
+                      index=["Total Revenue", "Gross Margin", "Net Income Common Stockholders"])
+    assert calculate_financial_ratios(df).empty
+
+def test_ratios_without_revenue_are_empty():
+    df = pd.DataFrame({"2023": [1.0]}, index=["Gross Profit"])
+    assert calculate_financial_ratios(df).empty
+    assert calculate_financial_ratios(pd.DataFrame()).empty
+
+def test_panel_ratios_match_each_ticker(page_frames):
+    frames = dict(page_frames)
+    # Tickers with renamed inputs and with no revenue at all
+    first = next(iter(frames.values()))
+    frames["ALIASES"] = first.rename(index={"Total Revenue": "Net Sales", "Net Income": "Net Earnings"})
+    frames["NO_REVENUE"] = first.drop(index="Total Revenue", errors="ignore")
+    ratios = calculate_panel_ratios(stack_panel(frames))
+    for ticker, df in frames.items():
+        expected = calculate_financial_ratios(df)
+        if expected.empty:
+            assert ticker not in ratios.index.get_level_values("ticker")
+        else:
+            assert_same_ratios(ratios.loc[ticker][df.columns], expected)